@@ -8,7 +8,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import Supabase modules
-from db_utils import get_supabase_session, init_supabase_tables
+from db_utils import get_supabase_session, get_db_session, init_supabase_tables
 from user_model import User
 from auth import login_user, display_user_info
 from user_management import display_user_management, create_initial_admin
@@ -20,9 +20,7 @@ from freezer import display_freezer_selection
 from rack import display_rack_selection
 from box import display_box_selection
 from sample import display_sample_management
-from sample_history import display_sample_history, display_sample_history_content
-from data_visualization import display_data_visualization, display_sample_overview
-from data_visualization import display_storage_utilization, display_sample_timeline, display_custom_analysis
+# data_visualization (Plotly) and sample_history are imported inside the tabs that use them
 
 # --- Streamlit Layout ---
 st.set_page_config(
@@ -33,8 +31,9 @@ st.markdown("<h1 style='text-align: center;'>❄️ cr.io ❄️</h1>", unsafe_a
 st.markdown("---")
 
 # --- Initialize Database ---
+@st.cache_resource
 def ensure_database_initialized():
-    """Ensure that the database is initialized with all required tables"""
+    """Ensure that the database is initialized with all required tables (once per process)"""
     try:
         # Initialize Supabase tables
         if init_supabase_tables():
@@ -47,37 +46,40 @@ def ensure_database_initialized():
         print(f"Error initializing database: {e}")
         return False
 
+# --- Table Checks ---
+@st.cache_data(ttl=600)
+def _available_tables() -> set:
+    """Names of the public Supabase tables, fetched with one RPC and cached
+    
+    Errors propagate, so a failed lookup is not cached and the next rerun retries.
+    """
+    with get_supabase_session() as supabase:
+        response = supabase.rpc("list_public_tables").execute()
+        return {row["table_name"] for row in response.data or []}
+
 # --- Initialize Session State ---
-def initialize_session_state():
-    """Initialize all session state variables"""
+_DEFAULTS = {
     # Navigation state
-    for key in ["selected_freezer", "selected_rack", "selected_box", "selected_well"]:
-        if key not in st.session_state:
-            st.session_state[key] = None
-    
+    "selected_freezer": None,
+    "selected_rack": None,
+    "selected_box": None,
+    "selected_well": None,
     # Box form position
-    if "box_form_position" not in st.session_state:
-        st.session_state.box_form_position = None
-    
+    "box_form_position": None,
     # Delete confirmation state
-    if "delete_confirmation" not in st.session_state:
-        st.session_state.delete_confirmation = False
-    if "delete_target" not in st.session_state:
-        st.session_state.delete_target = None
-    if "delete_type" not in st.session_state:
-        st.session_state.delete_type = None
-    
+    "delete_confirmation": False,
+    "delete_target": None,
+    "delete_type": None,
     # User state
-    if "user_id" not in st.session_state:
-        st.session_state.user_id = None
-    if "user_role" not in st.session_state:
-        st.session_state.user_role = None
-    if "username" not in st.session_state:
-        st.session_state.username = None
-    
-    # Database initialization state
-    if "database_initialized" not in st.session_state:
-        st.session_state.database_initialized = ensure_database_initialized()
+    "user_id": None,
+    "user_role": None,
+    "username": None,
+}
+
+def initialize_session_state():
+    """Initialize all session state variables"""
+    for key, value in _DEFAULTS.items():
+        st.session_state.setdefault(key, value)
 
 # Initialize session state
 initialize_session_state()
@@ -86,7 +88,7 @@ initialize_session_state()
 def main():
     """Main application function"""
     # Check if database is initialized
-    if not st.session_state.database_initialized:
+    if not ensure_database_initialized():
         st.error("Database connection to Supabase failed. Please check your credentials.")
         
         # Show configuration status
@@ -112,8 +114,9 @@ def main():
             st.warning("However, connection to Supabase failed. Please check if the credentials are correct.")
         
         if st.button("Retry Connection"):
+            # Drop the cached failure so the check runs again
+            ensure_database_initialized.clear()
             if ensure_database_initialized():
-                st.session_state.database_initialized = True
                 st.success("Connected to Supabase successfully!")
                 st.rerun()
             else:
@@ -144,20 +147,28 @@ def main():
         if selected_tab == "Sample Management":
             st.markdown("## Sample Management")
             
-            # Display search interface
-            display_search_interface()
-            
-            # Display hierarchical navigation
-            display_freezer_selection()
-            display_rack_selection()
-            display_box_selection()
-            display_sample_management()
+            # One session serves search and the whole panel; the box selector
+            # is a fragment that can rerun on its own, so it opens its own
+            with get_db_session() as session:
+                # Display search interface
+                display_search_interface(session)
+                
+                # Display hierarchical navigation
+                display_freezer_selection(session)
+                display_rack_selection(session)
+                display_box_selection()
+                display_sample_management(session)
             
         elif selected_tab == "Data Visualization":
             st.markdown("## Data Visualization")
             
             # Try to display data visualization
             try:
+                from data_visualization import (
+                    display_sample_overview, display_storage_utilization,
+                    display_sample_timeline, display_custom_analysis
+                )
+                
                 # Instead of using an expander, display directly
                 tabs = st.tabs(["Sample Overview", "Storage Utilization", "Sample Timeline", "Custom Analysis"])
                 
@@ -180,14 +191,14 @@ def main():
         elif selected_tab == "Sample History":
             st.markdown("## Sample History")
             
-            # Try to display sample history
+            # Try to display sample history if the table is reachable
             try:
-                # Check if we can access the sample_history table
-                with get_supabase_session() as supabase:
-                    response = supabase.table("sample_history").select("count", count="exact").limit(1).execute()
-                    
-                    # If we get here, the table exists
+                if "sample_history" in _available_tables():
+                    from sample_history import display_sample_history_content
                     display_sample_history_content()
+                else:
+                    st.warning("Sample history is not available.")
+                    st.info("Make sure your Supabase tables are properly set up.")
             except Exception as e:
                 st.warning(f"Sample history is not available. Error: {str(e)}")
                 st.info("Make sure your Supabase tables are properly set up.")
@@ -2,9 +2,25 @@ import streamlit as st
 import os
 from functools import wraps
 from datetime import datetime
+from cachetools import TTLCache
 from user_model import User
 from db_utils import get_supabase_session
 
+@st.cache_data(ttl=60)
+def _user_by_id(user_id):
+    """Cached User.get_by_id; a short TTL keeps role changes from going stale for long"""
+    return User.get_by_id(user_id)
+
+@st.cache_data(ttl=60)
+def _user_by_username(username):
+    """Cached User.get_by_username"""
+    return User.get_by_username(username)
+
+def clear_user_cache():
+    """Drop cached user lookups after a user record changes"""
+    _user_by_id.clear()
+    _user_by_username.clear()
+
 def login_user():
     """Display login form and authenticate user"""
     if "user_id" not in st.session_state:
@@ -21,7 +37,7 @@ def login_user():
         
         if submit:
             # Get user from Supabase
-            user = User.get_by_username(username)
+            user = _user_by_username(username)
             
             if user and user.check_password(password):
                 if user.is_active:
@@ -31,6 +47,7 @@ def login_user():
                     
                     # Update last login time
                     user.update_last_login()
+                    clear_user_cache()
                     
                     st.success(f"Welcome, {user.username}!")
                     st.rerun()
@@ -62,7 +79,7 @@ def verify_admin_password(operation_name="this operation"):
         submit = st.form_submit_button("Verify")
         
         if submit:
-            user = User.get_by_id(st.session_state.user_id)
+            user = _user_by_id(st.session_state.user_id)
             if user and user.check_password(password):
                 st.success("Password verified")
                 return True
@@ -127,7 +144,8 @@ def display_user_info():
                 logout_user()
 
 # Rate limiting for login attempts
-login_attempts = {}
+# Entries expire 15 minutes after the last attempt, so the dict stays bounded
+login_attempts = TTLCache(maxsize=10_000, ttl=900)
 
 def check_rate_limit(username, ip_address="unknown"):
     """Check if login attempts should be rate limited"""
@@ -140,16 +158,13 @@ def check_rate_limit(username, ip_address="unknown"):
         attempts, last_attempt_time = login_attempts[key]
         
         # If too many recent attempts, enforce a cooldown
+        # (expired entries are evicted by the cache, so any hit is recent)
         time_diff = (current_time - last_attempt_time).total_seconds()
-        if attempts >= 5 and time_diff < 900:  # 15 minutes (900 seconds)
+        if attempts >= 5:
             remaining = 15 - time_diff / 60
             return False, f"Too many login attempts. Please try again in {remaining:.1f} minutes."
         
-        # Reset attempts if cooldown period has passed
-        if time_diff > 900:
-            login_attempts[key] = (1, current_time)
-        else:
-            login_attempts[key] = (attempts + 1, current_time)
+        login_attempts[key] = (attempts + 1, current_time)
     else:
         # First attempt
         login_attempts[key] = (1, current_time)
@@ -1,6 +1,20 @@
+import os
+import bcrypt
 import streamlit as st
 from db_utils import get_db_session
 
+# Admin password hash, computed once at import.
+# Set ADMIN_PW_HASH to a bcrypt hash to replace the default password.
+_ADMIN_HASH = os.environ.get("ADMIN_PW_HASH", "").encode("utf-8") or bcrypt.hashpw(b"admin123", bcrypt.gensalt())
+
+def check_admin_password(password):
+    """Check a password against the admin password hash"""
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), _ADMIN_HASH)
+    except ValueError:
+        # Malformed ADMIN_PW_HASH
+        return False
+
 def verify_admin_password(operation_name="this operation", password_key="admin_pw"):
     """Verify admin password before performing destructive operations"""
     password_correct = False
@@ -11,10 +25,7 @@ def verify_admin_password(operation_name="this operation", password_key="admin_p
         submit = st.form_submit_button("Verify")
         
         if submit:
-            # Change this to your desired admin password
-            # In a production environment, this should use environment variables
-            # and proper password hashing
-            if password == "admin123":
+            if check_admin_password(password):
                 password_correct = True
                 st.success("Password verified")
             else:
@@ -35,13 +46,8 @@ def handle_delete_confirmation(item_type, item_id, delete_function, additional_p
     if additional_params is None:
         additional_params = {}
     
-    # Set up session state for deletion confirmation
-    if "delete_confirmation" not in st.session_state:
-        st.session_state.delete_confirmation = False
-    if "delete_target" not in st.session_state:
-        st.session_state.delete_target = None
-    if "delete_type" not in st.session_state:
-        st.session_state.delete_type = None
+    # delete_confirmation, delete_target and delete_type are guaranteed to exist:
+    # app.py's initialize_session_state sets them before any page renders
     
     # Request confirmation
     if st.button(f"Delete {item_type.title()}"):
@@ -62,8 +68,7 @@ def handle_delete_confirmation(item_type, item_id, delete_function, additional_p
         col1, col2 = st.columns([1, 4])
         with col1:
             if st.button("Confirm Delete"):
-                # Change this to your desired admin password
-                if password == "admin123":
+                if check_admin_password(password):
                     with get_db_session() as session:
                         success = delete_function(session, item_id, **additional_params)
                         if success:
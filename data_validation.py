@@ -1,62 +1,69 @@
 import re
+import numpy as np
 import pandas as pd
-from db_utils import get_db_session
+from functools import lru_cache
+from db_utils import get_db_session, inventory_cache
 from model import Sample, Box
 
+# Patterns used on every CSV row, compiled once
+_WELL_PARTS = re.compile(r'^([A-Z])([0-9]{1,2})$')
+# HTML/script tags or quote/semicolon characters, stripped in one pass
+_SANITIZE_RE = re.compile(r'<[^>]*>|[\'";]')
+
+SAMPLE_TYPES = ("Cell Line", "DNA", "RNA", "Protein", "Other")
+_DEFAULT_SAMPLE_TYPES = frozenset(SAMPLE_TYPES)
+
+def _is_well_format(well):
+    """Hand-written well check for the hot path: a letter A-Z then 1-2 digits"""
+    n = len(well)
+    if n < 2 or n > 3:
+        return False
+    c = ord(well[0])
+    digits = well[1:]
+    # isdigit() alone also accepts non-ASCII digits such as '²'
+    return 65 <= c <= 90 and digits.isascii() and digits.isdigit()
+
 class ValidationError(Exception):
     """Exception raised for validation errors"""
     pass
 
-def validate_well_format(well):
+@inventory_cache
+@lru_cache(maxsize=256)
+def get_box_dimensions(freezer, rack, box):
     """
-    Validate that a well position is in the correct format (e.g., A1, B12)
-    
-    Parameters:
-    - well: The well position to validate
+    Return (rows, columns) for a box, or None if it does not exist
     
-    Returns:
-    - True if valid, raises ValidationError if invalid
+    Cached per box; cleared by invalidate_inventory_caches() after boxes are
+    added, resized, moved or deleted.
     """
-    if not well:
-        raise ValidationError("Well position cannot be empty")
-    
-    # Well format should be a letter followed by a number (e.g., A1, B12)
-    pattern = r'^[A-Z][0-9]{1,2}$'
-    if not re.match(pattern, well):
-        raise ValidationError(f"Well position '{well}' is invalid. Format should be a letter followed by a number (e.g., A1, B12)")
+    with get_db_session() as session:
+        box_info = session.query(Box.rows, Box.columns).filter_by(
+            freezer_name=freezer,
+            rack_id=rack,
+            id=box
+        ).first()
     
-    return True
+    return tuple(box_info) if box_info else None
 
-def validate_well_in_box(well, box_rows, box_cols):
-    """
-    Validate that a well position is within the box dimensions
-    
-    Parameters:
-    - well: The well position to validate
-    - box_rows: Number of rows in the box
-    - box_cols: Number of columns in the box
-    
-    Returns:
-    - True if valid, raises ValidationError if invalid
-    """
+def _parse_and_check_well(well, box_rows, box_cols):
+    """Check a well's format and box bounds in one pass; returns (row_index, col_number)"""
     if not well:
         raise ValidationError("Well position cannot be empty")
     
-    # Extract row letter and column number
-    row_letter = well[0]
-    col_number = int(well[1:])
+    if not _is_well_format(well):
+        raise ValidationError(f"Well position '{well}' is invalid. Format should be a letter followed by a number (e.g., A1, B12)")
     
-    # Convert row letter to index (A=0, B=1, etc.)
+    row_letter = well[0]
     row_index = ord(row_letter) - ord('A')
+    col_number = int(well[1:])
     
-    # Check if row and column are within box dimensions
-    if row_index < 0 or row_index >= box_rows:
+    if row_index >= box_rows:
         raise ValidationError(f"Row '{row_letter}' is outside the box dimensions (max row: {chr(ord('A') + box_rows - 1)})")
     
     if col_number < 1 or col_number > box_cols:
         raise ValidationError(f"Column '{col_number}' is outside the box dimensions (max column: {box_cols})")
     
-    return True
+    return row_index, col_number
 
 def validate_sample_name(sample_name):
     """
@@ -87,18 +94,21 @@ def validate_sample_type(sample_type, allowed_types=None):
     Returns:
     - True if valid, raises ValidationError if invalid
     """
+    # Keep the ordered sequence for the error message, test against a set
     if allowed_types is None:
-        allowed_types = ["Cell Line", "DNA", "RNA", "Protein", "Other"]
+        allowed_types, allowed = SAMPLE_TYPES, _DEFAULT_SAMPLE_TYPES
+    else:
+        allowed = frozenset(allowed_types)
     
     if not sample_type:
         raise ValidationError("Sample type cannot be empty")
     
-    if sample_type not in allowed_types:
+    if sample_type not in allowed:
         raise ValidationError(f"Sample type '{sample_type}' is not valid. Allowed types: {', '.join(allowed_types)}")
     
     return True
 
-def validate_unique_sample(freezer, rack, box, well, sample_id=None):
+def validate_unique_sample(freezer, rack, box, well, sample_id=None, session=None):
     """
     Validate that a sample is unique in the given location
     
@@ -108,29 +118,37 @@ def validate_unique_sample(freezer, rack, box, well, sample_id=None):
     - box: Box ID
     - well: Well position
     - sample_id: ID of the current sample (for updates, to exclude from uniqueness check)
+    - session: Open database session to reuse (default: open a new one)
+    
+    The unique index ix_sample_location enforces the same rule in the
+    database, covering concurrent saves this check cannot see.
     
     Returns:
     - True if valid, raises ValidationError if invalid
     """
-    with get_db_session() as session:
-        query = session.query(Sample).filter_by(
-            freezer=freezer,
-            rack=rack,
-            box=box,
-            well=well
-        )
-        
-        if sample_id is not None:
-            query = query.filter(Sample.id != sample_id)
-        
-        existing_sample = query.first()
-        
-        if existing_sample:
-            raise ValidationError(f"A sample already exists at location {freezer}/{rack}/{box}/{well} (Sample: {existing_sample.sample_name})")
+    if session is None:
+        with get_db_session() as session:
+            return validate_unique_sample(freezer, rack, box, well, sample_id, session=session)
+    
+    # Only the name is needed for the message, so skip loading the full row
+    query = session.query(Sample.sample_name).filter_by(
+        freezer=freezer,
+        rack=rack,
+        box=box,
+        well=well
+    )
+    
+    if sample_id is not None:
+        query = query.filter(Sample.id != sample_id)
+    
+    existing_sample = query.first()
+    
+    if existing_sample:
+        raise ValidationError(f"A sample already exists at location {freezer}/{rack}/{box}/{well} (Sample: {existing_sample.sample_name})")
     
     return True
 
-def validate_sample_form(freezer, rack, box, well, sample_name, sample_type, sample_id=None):
+def validate_sample_form(freezer, rack, box, well, sample_name, sample_type, sample_id=None, session=None):
     """
     Validate all sample form fields
     
@@ -142,33 +160,38 @@ def validate_sample_form(freezer, rack, box, well, sample_name, sample_type, sam
     - sample_name: Sample name
     - sample_type: Sample type
     - sample_id: ID of the current sample (for updates)
+    - session: Open database session to reuse for the uniqueness check
     
     Returns:
     - True if all validations pass, raises ValidationError if any validation fails
     """
     # Get box dimensions
-    with get_db_session() as session:
-        box_info = session.query(Box).filter_by(
-            freezer_name=freezer,
-            rack_id=rack,
-            id=box
-        ).first()
-        
-        if not box_info:
-            raise ValidationError(f"Box {box} not found in rack {rack} of freezer {freezer}")
-        
-        box_rows = box_info.rows
-        box_cols = box_info.columns
+    box_dims = get_box_dimensions(freezer, rack, box)
+    if not box_dims:
+        raise ValidationError(f"Box {box} not found in rack {rack} of freezer {freezer}")
+    
+    box_rows, box_cols = box_dims
     
     # Validate all fields
-    validate_well_format(well)
-    validate_well_in_box(well, box_rows, box_cols)
+    _parse_and_check_well(well, box_rows, box_cols)
     validate_sample_name(sample_name)
     validate_sample_type(sample_type)
-    validate_unique_sample(freezer, rack, box, well, sample_id)
+    validate_unique_sample(freezer, rack, box, well, sample_id, session=session)
     
     return True
 
+def _duplicate_well_errors(df):
+    """Error for wells named by more than one CSV row
+    
+    Blank rows count too: a named and a blank row for the same well would
+    update and then delete the same sample.
+    """
+    wells = df["well"].dropna().astype(str)
+    duplicate_wells = wells[wells.duplicated(keep=False)].unique()
+    if duplicate_wells.size:
+        return [f"Duplicate wells in CSV: {', '.join(duplicate_wells)}"]
+    return []
+
 def validate_csv_upload(df, freezer, rack, box):
     """
     Validate a CSV upload for bulk sample import
@@ -185,19 +208,12 @@ def validate_csv_upload(df, freezer, rack, box):
     errors = []
     
     # Get box dimensions
-    with get_db_session() as session:
-        box_info = session.query(Box).filter_by(
-            freezer_name=freezer,
-            rack_id=rack,
-            id=box
-        ).first()
-        
-        if not box_info:
-            errors.append(f"Box {box} not found in rack {rack} of freezer {freezer}")
-            return False, errors
-        
-        box_rows = box_info.rows
-        box_cols = box_info.columns
+    box_dims = get_box_dimensions(freezer, rack, box)
+    if not box_dims:
+        errors.append(f"Box {box} not found in rack {rack} of freezer {freezer}")
+        return False, errors
+    
+    box_rows, box_cols = box_dims
     
     # Check required columns
     required_columns = ["freezer", "rack", "box", "well", "sample_name", "sample_type"]
@@ -207,33 +223,57 @@ def validate_csv_upload(df, freezer, rack, box):
         errors.append(f"Missing required columns: {', '.join(missing_columns)}")
         return False, errors
     
-    # Validate each row
-    for i, row in df.iterrows():
-        # Skip empty rows or rows with empty sample names
-        if pd.isna(row["sample_name"]) or str(row["sample_name"]).strip() == "":
-            continue
-        
-        try:
-            # Validate well format and dimensions
-            well = row["well"]
-            validate_well_format(well)
-            validate_well_in_box(well, box_rows, box_cols)
-            
-            # Validate sample name and type
-            sample_name = row["sample_name"]
-            sample_type = row["sample_type"]
-            validate_sample_name(sample_name)
-            validate_sample_type(sample_type)
-            
-        except ValidationError as e:
-            errors.append(f"Row {i+1}: {str(e)}")
-    
-    # Check for duplicate wells in the CSV
-    well_counts = df["well"].value_counts()
-    duplicate_wells = well_counts[well_counts > 1].index.tolist()
-    
-    if duplicate_wells:
-        errors.append(f"Duplicate wells in CSV: {', '.join(duplicate_wells)}")
+    # Drop empty rows or rows with empty sample names up front, keeping each
+    # remaining row's 1-based position in the CSV for error messages
+    has_name = df["sample_name"].notna() & (df["sample_name"].astype(str).str.strip() != "")
+    rows = df[has_name]
+    if rows.empty:
+        errors.extend(_duplicate_well_errors(df))
+        return len(errors) == 0, errors
+    
+    row_numbers = pd.Series(np.flatnonzero(has_name.to_numpy()) + 1, index=rows.index)
+    wells = rows["well"].fillna("").astype(str)
+    names = rows["sample_name"].astype(str)
+    types = rows["sample_type"]
+    
+    # Run each check over whole columns, in the same order as the single-sample
+    # validators. Those validators are only called on failing rows, to build
+    # the error message.
+    parts = wells.str.extract(_WELL_PARTS)
+    well_ok = parts[0].notna()
+    
+    # Bounds-check the well-formed rows on plain numpy arrays; a one-character
+    # unicode array viewed as int32 gives the letters' code points
+    row_index = parts.loc[well_ok, 0].to_numpy().astype("U1").view(np.int32) - ord('A')
+    col_number = parts.loc[well_ok, 1].to_numpy().astype(np.int16)
+    out_of_box = (row_index >= box_rows) | (col_number < 1) | (col_number > box_cols)
+    in_box = well_ok.copy()
+    in_box[well_ok] = ~out_of_box
+    
+    # Values outside the allowed categories (including missing ones) become NaN
+    type_codes = pd.Categorical(types, categories=SAMPLE_TYPES)
+    bad_type = pd.Series(type_codes.isna(), index=rows.index)
+    
+    checks = [
+        (~well_ok, lambda i: _parse_and_check_well(wells[i], box_rows, box_cols)),
+        (~in_box, lambda i: _parse_and_check_well(wells[i], box_rows, box_cols)),
+        (names.str.len() > 100, lambda i: validate_sample_name(names[i])),
+        (bad_type, lambda i: validate_sample_type(types[i])),
+    ]
+    
+    # Each row reports only its first failing check
+    row_errors = {}
+    failed = pd.Series(False, index=rows.index)
+    for mask, validate in checks:
+        for i in rows.index[(mask & ~failed).to_numpy()]:
+            try:
+                validate(i)
+            except ValidationError as e:
+                row_errors[i] = f"Row {row_numbers[i]}: {str(e)}"
+        failed |= mask
+    errors.extend(row_errors[i] for i in rows.index if i in row_errors)
+    
+    errors.extend(_duplicate_well_errors(df))
     
     return len(errors) == 0, errors
 
@@ -253,10 +293,21 @@ def sanitize_input(input_str):
     # Convert to string if not already
     input_str = str(input_str)
     
-    # Remove any HTML/script tags
-    input_str = re.sub(r'<[^>]*>', '', input_str)
+    # Most values are clean; only run the regex when there is something to strip
+    if "<" in input_str or "'" in input_str or '"' in input_str or ";" in input_str:
+        # Remove any HTML/script tags and SQL injection patterns
+        input_str = _SANITIZE_RE.sub('', input_str)
     
-    # Remove any SQL injection patterns
-    input_str = re.sub(r'[\'";]', '', input_str)
+    return input_str.strip()
+
+def sanitize_series(values):
+    """
+    Column-wise sanitize_input for a pandas Series; missing values become empty strings
     
-    return input_str.strip()
\ No newline at end of file
+    Parameters:
+    - values: Series of raw cell values
+    
+    Returns:
+    - Series of sanitized strings
+    """
+    return values.fillna("").astype(str).str.replace(_SANITIZE_RE, "", regex=True).str.strip()
@@ -1,13 +1,89 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from db_utils import get_db_session
+from functools import lru_cache
+from sqlalchemy import case, func
+from db_utils import get_db_session, inventory_cache
 from model import Sample, Freezer, Rack, Box
 from auth import require_login
 
+def _top_n_with_other(df, label_column, n):
+    """Keep the n largest rows by Count, in descending order, and fold the rest into an 'Other' row"""
+    top = df.nlargest(n, 'Count').reset_index(drop=True)
+    if len(df) > n:
+        top.loc[n] = pd.Series({label_column: 'Other', 'Count': df['Count'].sum() - top['Count'].sum()})
+    return top
+
+# Line charts never need more points per series than the chart is wide in pixels
+MAX_POINTS_PER_SERIES = 2000
+
+def _lttb_indices(x, y, n_out):
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling of sorted x/y arrays"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    # The first and last points are always kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket, or the last point for the final bucket
+        if i + 2 < len(edges):
+            avg_x = x[end:edges[i + 2]].mean()
+            avg_y = y[end:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        
+        # Keep the point forming the largest triangle with the previous pick and that average
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    
+    return keep
+
+def _downsample_timeline(df, x, y, group, n_out=MAX_POINTS_PER_SERIES):
+    """Downsample each group's date-sorted series to at most n_out points with LTTB"""
+    if len(df) <= n_out:
+        return df
+    
+    parts = []
+    for _, part in df.groupby(group, sort=False, observed=True):
+        if len(part) > n_out:
+            xs = part[x].astype('int64').to_numpy(dtype=float)
+            ys = part[y].to_numpy(dtype=float)
+            part = part.iloc[_lttb_indices(xs, ys, n_out)]
+        parts.append(part)
+    
+    return pd.concat(parts)
+
+@lru_cache(maxsize=32)
+def _row_labels(n):
+    """Heatmap row labels A, B, C, ... for n rows"""
+    return tuple(chr(65 + r) for r in range(n))
+
+@lru_cache(maxsize=32)
+def _col_labels(n):
+    """Heatmap column labels 1, 2, 3, ... for n columns"""
+    return tuple(str(c + 1) for c in range(n))
+
+@lru_cache(maxsize=1024)
+def _coord_index(coord):
+    """Zero-based (row, column) for a slot or well like 'B12', or None if malformed"""
+    if not coord or len(coord) < 2 or not coord[1:].isdigit():
+        return None
+    r, c = ord(coord[0]) - 65, int(coord[1:]) - 1
+    if r < 0 or c < 0:
+        return None
+    return r, c
+
 @require_login
 def display_data_visualization():
     """Display data visualization dashboard"""
@@ -25,333 +101,371 @@ def display_data_visualization():
     with tabs[3]:
         display_custom_analysis()
 
-def display_sample_overview():
-    """Display overview of samples by type, owner, etc."""
-    st.subheader("Sample Overview")
-    
+@inventory_cache
+@st.cache_data(ttl=60)
+def _fetch_sample_overview():
+    """Total sample count plus sample counts by type, owner and cell-line species"""
     with get_db_session() as session:
-        # Get total sample count
-        total_samples = session.query(Sample).count()
+        total_samples = session.query(func.count(Sample.id)).scalar()
         
-        if total_samples == 0:
-            st.warning("No samples found in the database.")
-            return
-        
-        st.metric("Total Samples", total_samples)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Sample distribution by type
-            sample_types = session.query(
+        df_types = pd.DataFrame(
+            session.query(
                 Sample.sample_type,
                 func.count(Sample.id).label('count')
-            ).group_by(Sample.sample_type).all()
-            
-            if sample_types:
-                df_types = pd.DataFrame(sample_types, columns=['Sample Type', 'Count'])
-                
-                fig = px.pie(
-                    df_types, 
-                    values='Count', 
-                    names='Sample Type',
-                    title='Sample Distribution by Type',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.qualitative.Pastel
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            ).group_by(Sample.sample_type).all(),
+            columns=['Sample Type', 'Count']
+        )
         
-        with col2:
-            # Sample distribution by owner
-            sample_owners = session.query(
+        df_owners = pd.DataFrame(
+            session.query(
                 Sample.owner,
                 func.count(Sample.id).label('count')
-            ).group_by(Sample.owner).all()
-            
-            if sample_owners:
-                df_owners = pd.DataFrame(sample_owners, columns=['Owner', 'Count'])
-                df_owners = df_owners.sort_values('Count', ascending=False)
-                
-                fig = px.bar(
-                    df_owners, 
-                    x='Owner', 
-                    y='Count',
-                    title='Sample Distribution by Owner',
-                    color='Count',
-                    color_continuous_scale='Viridis'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-        
-        # Species distribution (for Cell Line samples)
-        cell_line_species = session.query(
-            Sample.species,
-            func.count(Sample.id).label('count')
-        ).filter(
-            Sample.sample_type == 'Cell Line',
-            Sample.species != ''
-        ).group_by(Sample.species).all()
+            ).group_by(Sample.owner).all(),
+            columns=['Owner', 'Count']
+        )
         
-        if cell_line_species:
-            df_species = pd.DataFrame(cell_line_species, columns=['Species', 'Count'])
-            df_species = df_species.sort_values('Count', ascending=False)
-            
-            # Limit to top 10 species for readability
-            if len(df_species) > 10:
-                other_count = df_species.iloc[10:]['Count'].sum()
-                df_species = df_species.iloc[:10]
-                df_species = pd.concat([
-                    df_species, 
-                    pd.DataFrame([{'Species': 'Other', 'Count': other_count}])
-                ])
+        # The type counts already say whether any cell lines exist; skip the
+        # species aggregate when there are none
+        species_rows = []
+        if (df_types['Sample Type'] == 'Cell Line').any():
+            species_rows = session.query(
+                Sample.species,
+                func.count(Sample.id).label('count')
+            ).filter(
+                Sample.sample_type == 'Cell Line',
+                Sample.species != ''
+            ).group_by(Sample.species).all()
+        df_species = pd.DataFrame(species_rows, columns=['Species', 'Count'])
+    
+    return total_samples, df_types, df_owners, df_species
+
+def display_sample_overview():
+    """Display overview of samples by type, owner, etc."""
+    st.subheader("Sample Overview")
+    
+    # Cached for a minute so tab switches and widget changes skip the queries
+    total_samples, df_types, df_owners, df_species = _fetch_sample_overview()
+    
+    if total_samples == 0:
+        st.warning("No samples found in the database.")
+        return
+    
+    st.metric("Total Samples", total_samples)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Sample distribution by type
+        if not df_types.empty:
+            fig = px.pie(
+                df_types, 
+                values='Count', 
+                names='Sample Type',
+                title='Sample Distribution by Type',
+                hole=0.4,
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        # Sample distribution by owner
+        if not df_owners.empty:
+            df_owners = df_owners.sort_values('Count', ascending=False)
             
             fig = px.bar(
-                df_species, 
-                x='Species', 
+                df_owners, 
+                x='Owner', 
                 y='Count',
-                title='Cell Line Samples by Species',
-                color='Species',
-                color_discrete_sequence=px.colors.qualitative.Bold
+                title='Sample Distribution by Owner',
+                color='Count',
+                color_continuous_scale='Viridis'
             )
             st.plotly_chart(fig, use_container_width=True)
+    
+    # Species distribution (for Cell Line samples)
+    if not df_species.empty:
+        # Limit to top 10 species for readability
+        df_species = _top_n_with_other(df_species, 'Species', 10)
+        
+        fig = px.bar(
+            df_species, 
+            x='Species', 
+            y='Count',
+            title='Cell Line Samples by Species',
+            color='Species',
+            color_discrete_sequence=px.colors.qualitative.Bold
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+@inventory_cache
+@st.cache_data(ttl=60)
+def _fetch_storage_stats():
+    """Freezer names, per-freezer rack/box/sample counts and the 10 most utilized boxes"""
+    with get_db_session() as session:
+        freezer_names = [name for (name,) in session.query(Freezer.name).all()]
+        
+        # One grouped count per table instead of one count per freezer and box
+        rack_counts = dict(session.query(
+            Rack.freezer_name, func.count(Rack.id)
+        ).group_by(Rack.freezer_name).all())
+        box_counts = dict(session.query(
+            Box.freezer_name, func.count(Box.id)
+        ).group_by(Box.freezer_name).all())
+        sample_counts = dict(session.query(
+            Sample.freezer, func.count(Sample.id)
+        ).group_by(Sample.freezer).all())
+        
+        # Rank boxes by utilization in SQL so only the top 10 rows come back
+        capacity = Box.rows * Box.columns
+        box_samples = func.count(Sample.id)
+        utilization = case((capacity > 0, box_samples * 100.0 / capacity), else_=0)
+        top_boxes = session.query(
+            Box.freezer_name,
+            Box.rack_id,
+            Box.id,
+            func.coalesce(func.nullif(Box.box_name, ''), Box.id),
+            capacity,
+            box_samples,
+            utilization
+        ).join(
+            Freezer, Freezer.name == Box.freezer_name
+        ).outerjoin(
+            Sample,
+            (Sample.freezer == Box.freezer_name) & (Sample.rack == Box.rack_id) & (Sample.box == Box.id)
+        ).group_by(
+            Box.freezer_name, Box.rack_id, Box.id
+        ).order_by(utilization.desc()).limit(10).all()
+    
+    df_freezers = pd.DataFrame({
+        'Freezer': freezer_names,
+        'Racks': [rack_counts.get(name, 0) for name in freezer_names],
+        'Boxes': [box_counts.get(name, 0) for name in freezer_names],
+        'Samples': [sample_counts.get(name, 0) for name in freezer_names]
+    })
+    df_top_boxes = pd.DataFrame(
+        top_boxes,
+        columns=['Freezer', 'Rack', 'Box', 'Box Name', 'Capacity', 'Samples', 'Utilization (%)']
+    )
+    
+    return freezer_names, df_freezers, df_top_boxes
+
+@inventory_cache
+@st.cache_data(ttl=60)
+def _fetch_freezer_layout(freezer_name):
+    """Racks in a freezer plus box capacity and sample count keyed by (rack, slot)"""
+    with get_db_session() as session:
+        racks = [
+            rack._asdict() for rack in session.query(
+                Rack.id, Rack.rows, Rack.columns
+            ).filter_by(freezer_name=freezer_name).all()
+        ]
+        
+        # Load every box and per-box sample count in this freezer once,
+        # instead of two queries per grid cell
+        box_capacity = {
+            (rack_id, box_id): rows * columns
+            for rack_id, box_id, rows, columns in session.query(
+                Box.rack_id, Box.id, Box.rows, Box.columns
+            ).filter_by(freezer_name=freezer_name).all()
+        }
+        sample_counts = {
+            (rack_id, box_id): count
+            for rack_id, box_id, count in session.query(
+                Sample.rack, Sample.box, func.count(Sample.id)
+            ).filter_by(freezer=freezer_name).group_by(Sample.rack, Sample.box).all()
+        }
+    
+    return racks, box_capacity, sample_counts
 
 def display_storage_utilization():
     """Display storage utilization metrics"""
     st.subheader("Storage Utilization")
     
-    with get_db_session() as session:
-        # Get freezer stats
-        freezers = session.query(Freezer).all()
-        
-        if not freezers:
-            st.warning("No freezers found in the database.")
-            return
-        
-        freezer_stats = []
-        for freezer in freezers:
-            # Count racks in this freezer
-            rack_count = session.query(Rack).filter_by(freezer_name=freezer.name).count()
-            
-            # Count boxes in this freezer
-            box_count = session.query(Box).filter_by(freezer_name=freezer.name).count()
-            
-            # Count samples in this freezer
-            sample_count = session.query(Sample).filter_by(freezer=freezer.name).count()
-            
-            freezer_stats.append({
-                'Freezer': freezer.name,
-                'Racks': rack_count,
-                'Boxes': box_count,
-                'Samples': sample_count
-            })
-        
-        df_freezers = pd.DataFrame(freezer_stats)
-        
-        # Display freezer stats
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Freezer comparison
+    # Cached for a minute so tab switches and widget changes skip the queries
+    freezer_names, df_freezers, top_boxes = _fetch_storage_stats()
+    
+    if not freezer_names:
+        st.warning("No freezers found in the database.")
+        return
+    
+    # Display freezer stats
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Freezer comparison
+        fig = px.bar(
+            df_freezers, 
+            x='Freezer', 
+            y=['Racks', 'Boxes', 'Samples'],
+            title='Storage by Freezer',
+            barmode='group'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        # Box utilization
+        if not top_boxes.empty:
+            # Display top 10 most utilized boxes
             fig = px.bar(
-                df_freezers, 
-                x='Freezer', 
-                y=['Racks', 'Boxes', 'Samples'],
-                title='Storage by Freezer',
-                barmode='group'
+                top_boxes, 
+                x='Box Name', 
+                y='Utilization (%)',
+                title='Top 10 Most Utilized Boxes',
+                color='Utilization (%)',
+                color_continuous_scale='RdYlGn_r',
+                hover_data=['Freezer', 'Rack', 'Samples', 'Capacity']
             )
             st.plotly_chart(fig, use_container_width=True)
+    
+    # Display freezer capacity heatmap
+    st.subheader("Freezer Capacity Heatmap")
+    
+    selected_freezer = st.selectbox(
+        "Select Freezer",
+        options=freezer_names
+    )
+    
+    if selected_freezer:
+        # Get racks in this freezer
+        racks, box_capacity, sample_counts = _fetch_freezer_layout(selected_freezer)
         
-        with col2:
-            # Box utilization
-            box_utilization = []
-            for freezer in freezers:
-                boxes = session.query(Box).filter_by(freezer_name=freezer.name).all()
-                
-                for box in boxes:
-                    # Calculate total capacity
-                    capacity = box.rows * box.columns
-                    
-                    # Count samples in this box
-                    sample_count = session.query(Sample).filter_by(
-                        freezer=freezer.name,
-                        rack=box.rack_id,
-                        box=box.id
-                    ).count()
-                    
-                    # Calculate utilization percentage
-                    utilization = (sample_count / capacity) * 100 if capacity > 0 else 0
-                    
-                    box_utilization.append({
-                        'Freezer': freezer.name,
-                        'Rack': box.rack_id,
-                        'Box': box.id,
-                        'Box Name': box.box_name or box.id,
-                        'Capacity': capacity,
-                        'Samples': sample_count,
-                        'Utilization (%)': utilization
-                    })
+        if not racks:
+            st.warning(f"No racks found in freezer {selected_freezer}.")
+        else:
+            # Fill one utilization matrix per rack from the boxes that exist;
+            # empty slots stay at 0%
+            heatmaps = {rack['id']: np.zeros((rack['rows'], rack['columns'])) for rack in racks}
+            for (rack_id, coord), capacity in box_capacity.items():
+                z = heatmaps.get(rack_id)
+                position = _coord_index(coord)
+                if z is None or position is None or capacity <= 0:
+                    continue
+                r, c = position
+                if r < z.shape[0] and c < z.shape[1]:
+                    z[r, c] = sample_counts.get((rack_id, coord), 0) / capacity * 100
             
-            if box_utilization:
-                df_utilization = pd.DataFrame(box_utilization)
-                
-                # Display top 10 most utilized boxes
-                top_boxes = df_utilization.sort_values('Utilization (%)', ascending=False).head(10)
-                
-                fig = px.bar(
-                    top_boxes, 
-                    x='Box Name', 
-                    y='Utilization (%)',
-                    title='Top 10 Most Utilized Boxes',
-                    color='Utilization (%)',
-                    color_continuous_scale='RdYlGn_r',
-                    hover_data=['Freezer', 'Rack', 'Samples', 'Capacity']
-                )
-                st.plotly_chart(fig, use_container_width=True)
-        
-        # Display freezer capacity heatmap
-        st.subheader("Freezer Capacity Heatmap")
-        
-        selected_freezer = st.selectbox(
-            "Select Freezer",
-            options=[f.name for f in freezers]
-        )
-        
-        if selected_freezer:
-            # Get racks in this freezer
-            racks = session.query(Rack).filter_by(freezer_name=selected_freezer).all()
+            # One figure with a heatmap per rack, wrapped three racks to a row;
+            # a fixed 0-100% scale lets all racks share the first colour bar
+            n_cols = min(len(racks), 3)
+            n_rows = -(-len(racks) // n_cols)
+            fig = make_subplots(
+                rows=n_rows,
+                cols=n_cols,
+                subplot_titles=[f"Rack {rack['id']}" for rack in racks]
+            )
+            for i, rack in enumerate(racks):
+                fig.add_trace(go.Heatmap(
+                    z=heatmaps[rack['id']],
+                    x=_col_labels(rack['columns']),
+                    y=_row_labels(rack['rows']),
+                    colorscale='RdYlGn_r',
+                    zmin=0,
+                    zmax=100,
+                    showscale=(i == 0),
+                    colorbar=dict(title='Utilization %')
+                ), row=i // n_cols + 1, col=i % n_cols + 1)
+            
+            fig.update_xaxes(title_text="Column")
+            fig.update_yaxes(title_text="Row")
+            fig.update_layout(
+                title=f"Box Utilization in Freezer {selected_freezer}",
+                height=350 * n_rows
+            )
             
-            if not racks:
-                st.warning(f"No racks found in freezer {selected_freezer}.")
-            else:
-                # Create a heatmap of box utilization
-                for rack in racks:
-                    st.write(f"**Rack: {rack.id}**")
-                    
-                    # Create a matrix for the heatmap
-                    heatmap_data = []
-                    for r in range(rack.rows):
-                        row_data = []
-                        for c in range(rack.columns):
-                            coord = f"{chr(65 + r)}{c + 1}"
-                            
-                            # Check if a box exists at this position
-                            box = session.query(Box).filter_by(
-                                freezer_name=selected_freezer,
-                                rack_id=rack.id,
-                                id=coord
-                            ).first()
-                            
-                            if box:
-                                # Calculate box utilization
-                                capacity = box.rows * box.columns
-                                sample_count = session.query(Sample).filter_by(
-                                    freezer=selected_freezer,
-                                    rack=rack.id,
-                                    box=coord
-                                ).count()
-                                
-                                utilization = (sample_count / capacity) * 100 if capacity > 0 else 0
-                                row_data.append(utilization)
-                            else:
-                                row_data.append(0)  # No box = 0% utilization
-                        
-                        heatmap_data.append(row_data)
-                    
-                    # Create heatmap
-                    fig = go.Figure(data=go.Heatmap(
-                        z=heatmap_data,
-                        x=[f"{c+1}" for c in range(rack.columns)],
-                        y=[chr(65 + r) for r in range(rack.rows)],
-                        colorscale='RdYlGn_r',
-                        showscale=True,
-                        colorbar=dict(title='Utilization %')
-                    ))
-                    
-                    fig.update_layout(
-                        title=f"Box Utilization in Rack {rack.id}",
-                        xaxis_title="Column",
-                        yaxis_title="Row"
-                    )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True)
+
+@inventory_cache
+@st.cache_data(ttl=60)
+def _fetch_daily_additions():
+    """Number of samples added per day and sample type, counted in the database"""
+    day = func.date(Sample.date_added)
+    with get_db_session() as session:
+        rows = session.query(
+            day, Sample.sample_type, func.count(Sample.id)
+        ).filter(
+            Sample.date_added.isnot(None),
+            Sample.sample_type.isnot(None)
+        ).group_by(day, Sample.sample_type).order_by(day).all()
+    
+    # Few distinct types, many rows: a categorical keeps the group-bys on integer codes
+    return pd.DataFrame(rows, columns=['Date', 'Sample Type', 'Count']).astype({'Sample Type': 'category'})
+
+@inventory_cache
+@st.cache_data(ttl=60)
+def _fetch_recent_samples(days=30):
+    """Samples added in the last `days` days, as display rows"""
+    since = datetime.now() - timedelta(days=days)
+    with get_db_session() as session:
+        # Plain column tuples; no Sample objects are needed for a read-only table
+        rows = session.query(
+            Sample.date_added, Sample.sample_name, Sample.sample_type,
+            Sample.freezer, Sample.rack, Sample.box, Sample.well, Sample.owner
+        ).filter(Sample.date_added >= since).all()
+    
+    if not rows:
+        return pd.DataFrame()
+    
+    df = pd.DataFrame(rows, columns=['date_added', 'Sample', 'Type', 'freezer', 'rack', 'box', 'well', 'Owner'])
+    df['Date'] = df['date_added'].dt.strftime('%Y-%m-%d')
+    df['Location'] = df['freezer'].astype(str).str.cat(
+        [df['rack'].astype(str), df['box'].astype(str), df['well'].astype(str)], sep='/'
+    )
+    
+    return df[['Date', 'Sample', 'Type', 'Location', 'Owner']]
 
 def display_sample_timeline():
     """Display sample addition timeline"""
     st.subheader("Sample Timeline")
     
-    with get_db_session() as session:
-        # Get sample addition dates
-        samples = session.query(Sample.date_added, Sample.sample_type).all()
-        
-        if not samples:
-            st.warning("No samples found in the database.")
-            return
-        
-        # Convert to DataFrame
-        df_samples = pd.DataFrame(samples, columns=['Date Added', 'Sample Type'])
-        
-        # Ensure date is datetime
-        df_samples['Date Added'] = pd.to_datetime(df_samples['Date Added'])
-        
-        # Filter out invalid dates
-        df_samples = df_samples[df_samples['Date Added'].notna()]
-        
-        if df_samples.empty:
-            st.warning("No valid dates found in sample data.")
-            return
-        
-        # Group by date and type
-        df_samples['Date'] = df_samples['Date Added'].dt.date
-        timeline_data = df_samples.groupby(['Date', 'Sample Type']).size().reset_index(name='Count')
-        
-        # Create timeline chart
-        fig = px.line(
-            timeline_data, 
-            x='Date', 
-            y='Count',
-            color='Sample Type',
-            title='Sample Additions Over Time',
-            markers=True
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Sample additions by month
-        df_samples['Month'] = df_samples['Date Added'].dt.to_period('M')
-        monthly_data = df_samples.groupby(['Month', 'Sample Type']).size().reset_index(name='Count')
-        monthly_data['Month'] = monthly_data['Month'].astype(str)
-        
-        fig = px.bar(
-            monthly_data, 
-            x='Month', 
-            y='Count',
-            color='Sample Type',
-            title='Monthly Sample Additions',
-            barmode='stack'
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Recent activity
-        st.subheader("Recent Activity")
-        
-        # Get samples added in the last 30 days
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_samples = session.query(Sample).filter(Sample.date_added >= thirty_days_ago).all()
-        
-        if not recent_samples:
-            st.info("No samples added in the last 30 days.")
-        else:
-            # Convert to DataFrame
-            recent_data = []
-            for sample in recent_samples:
-                recent_data.append({
-                    'Date': sample.date_added.strftime('%Y-%m-%d'),
-                    'Sample': sample.sample_name,
-                    'Type': sample.sample_type,
-                    'Location': f"{sample.freezer}/{sample.rack}/{sample.box}/{sample.well}",
-                    'Owner': sample.owner
-                })
-            
-            df_recent = pd.DataFrame(recent_data)
-            st.dataframe(df_recent, use_container_width=True)
+    # Daily counts per sample type (cached for a minute); one row per day
+    # and type rather than one per sample
+    timeline_data = _fetch_daily_additions()
+    
+    if timeline_data.empty:
+        st.warning("No samples with a valid date found in the database.")
+        return
+    
+    # SQLite returns the day as text
+    timeline_data['Date'] = pd.to_datetime(timeline_data['Date'])
+    
+    # Create timeline chart; long histories are downsampled per type so the
+    # browser only draws what is visible
+    fig = px.line(
+        _downsample_timeline(timeline_data, 'Date', 'Count', 'Sample Type'), 
+        x='Date', 
+        y='Count',
+        color='Sample Type',
+        title='Sample Additions Over Time',
+        markers=True
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Sample additions by month, rolled up from the daily counts
+    monthly_data = timeline_data.assign(
+        Month=timeline_data['Date'].dt.to_period('M')
+    ).groupby(['Month', 'Sample Type'], observed=True)['Count'].sum().reset_index()
+    monthly_data['Month'] = monthly_data['Month'].astype(str)
+    
+    fig = px.bar(
+        monthly_data, 
+        x='Month', 
+        y='Count',
+        color='Sample Type',
+        title='Monthly Sample Additions',
+        barmode='stack'
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Recent activity
+    st.subheader("Recent Activity")
+    
+    # Get samples added in the last 30 days
+    df_recent = _fetch_recent_samples()
+    
+    if df_recent.empty:
+        st.info("No samples added in the last 30 days.")
+    else:
+        st.dataframe(df_recent, use_container_width=True)
 
 def display_custom_analysis():
     """Display custom analysis options"""
@@ -410,32 +524,23 @@ def display_sample_type_by_freezer():
 def display_owner_activity():
     """Display owner activity analysis"""
     with get_db_session() as session:
-        # Get sample counts by owner and date
+        # Get sample counts by owner and date; rows without a date are skipped in SQL
         samples = session.query(
             Sample.owner,
             Sample.date_added
-        ).all()
+        ).filter(Sample.date_added.isnot(None)).all()
         
         if not samples:
             st.warning("No data available for this analysis.")
             return
         
-        # Convert to DataFrame
-        df = pd.DataFrame(samples, columns=['Owner', 'Date Added'])
-        
-        # Ensure date is datetime
-        df['Date Added'] = pd.to_datetime(df['Date Added'])
-        
-        # Filter out invalid dates
-        df = df[df['Date Added'].notna()]
-        
-        if df.empty:
-            st.warning("No valid dates found in sample data.")
-            return
+        # date_added is a DateTime column, so the driver already returns datetimes
+        # and the frame gets a datetime64 column without parsing
+        df = pd.DataFrame(samples, columns=['Owner', 'Date Added']).astype({'Owner': 'category'})
         
         # Group by owner and month
         df['Month'] = df['Date Added'].dt.to_period('M')
-        activity_data = df.groupby(['Owner', 'Month']).size().reset_index(name='Samples Added')
+        activity_data = df.groupby(['Owner', 'Month'], observed=True).size().reset_index(name='Samples Added')
         activity_data['Month'] = activity_data['Month'].astype(str)
         
         # Create visualization
@@ -450,7 +555,8 @@ def display_owner_activity():
         st.plotly_chart(fig, use_container_width=True)
         
         # Owner summary
-        owner_summary = df.groupby('Owner').size().reset_index(name='Total Samples')
+        # Roll the monthly counts up per owner rather than grouping every sample again
+        owner_summary = activity_data.groupby('Owner', observed=True)['Samples Added'].sum().reset_index(name='Total Samples')
         owner_summary = owner_summary.sort_values('Total Samples', ascending=False)
         
         fig = px.pie(
@@ -462,6 +568,47 @@ def display_owner_activity():
         )
         st.plotly_chart(fig, use_container_width=True)
 
+@inventory_cache
+@st.cache_data(ttl=60)
+def _fetch_box_density(freezer_name, rack_id, box_id, rows, columns):
+    """Occupancy matrix, well annotations and sample list for one box"""
+    with get_db_session() as session:
+        samples = session.query(
+            Sample.well, Sample.sample_name, Sample.sample_type, Sample.owner, Sample.date_added
+        ).filter_by(
+            freezer=freezer_name,
+            rack=rack_id,
+            box=box_id
+        ).all()
+    
+    # Create a matrix for the heatmap: 1 = occupied, 0 = empty
+    heatmap_data = np.zeros((rows, columns), dtype=np.int8)
+    annotations = []
+    by_well = {s.well: s for s in samples}
+    
+    for well, sample in by_well.items():
+        position = _coord_index(well)
+        if position is None:
+            continue
+        r, c = position
+        if r < rows and c < columns:
+            heatmap_data[r, c] = 1
+            annotations.append(
+                dict(
+                    x=c,
+                    y=r,
+                    text=sample.sample_name[:10],
+                    showarrow=False,
+                    font=dict(size=8)
+                )
+            )
+    
+    # Build the sample list straight from the row tuples and format the dates as a column
+    df_samples = pd.DataFrame(samples, columns=['Well', 'Sample Name', 'Type', 'Owner', 'Date Added'])
+    df_samples['Date Added'] = pd.to_datetime(df_samples['Date Added']).dt.strftime('%Y-%m-%d').fillna('')
+    
+    return heatmap_data, annotations, df_samples
+
 def display_sample_density():
     """Display sample density by location"""
     with get_db_session() as session:
@@ -528,88 +675,46 @@ def display_sample_density():
         # Extract box ID from display name
         selected_box = selected_box_display.split(" - ")[0]
         
-        # Get the selected box
-        box = session.query(Box).filter_by(
-            freezer_name=selected_freezer,
-            rack_id=selected_rack,
-            id=selected_box
-        ).first()
+        # Get the selected box from the boxes already loaded
+        box = next((b for b in boxes if b.id == selected_box), None)
         
         if not box:
             st.warning(f"Box {selected_box} not found in rack {selected_rack}.")
             return
         
-        # Get samples in this box
-        samples = session.query(Sample).filter_by(
-            freezer=selected_freezer,
-            rack=selected_rack,
-            box=selected_box
-        ).all()
+        # Read what the figure needs before the session closes
+        box_label = box.box_name or box.id
+        box_rows, box_cols = box.rows, box.columns
         
-        # Create a matrix for the heatmap
-        heatmap_data = []
-        annotations = []
-        
-        for r in range(box.rows):
-            row_data = []
-            for c in range(box.columns):
-                well = f"{chr(65 + r)}{c + 1}"
-                
-                # Check if a sample exists at this position
-                sample = next((s for s in samples if s.well == well), None)
-                
-                if sample:
-                    row_data.append(1)  # 1 = occupied
-                    annotations.append(
-                        dict(
-                            x=c,
-                            y=r,
-                            text=sample.sample_name[:10],
-                            showarrow=False,
-                            font=dict(size=8)
-                        )
-                    )
-                else:
-                    row_data.append(0)  # 0 = empty
-            
-            heatmap_data.append(row_data)
-        
-        # Create heatmap
-        fig = go.Figure(data=go.Heatmap(
-            z=heatmap_data,
-            x=[f"{c+1}" for c in range(box.columns)],
-            y=[chr(65 + r) for r in range(box.rows)],
-            colorscale=[[0, 'white'], [1, 'green']],
-            showscale=False
-        ))
-        
-        fig.update_layout(
-            title=f"Sample Density in Box {box.box_name or box.id}",
-            xaxis_title="Column",
-            yaxis_title="Row",
-            annotations=annotations
+        # The matrix, labels and sample list are cached per box (and size)
+        heatmap_data, annotations, df_samples = _fetch_box_density(
+            selected_freezer, selected_rack, selected_box, box_rows, box_cols
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Display sample list
-        if samples:
-            st.subheader(f"Samples in Box {box.box_name or box.id}")
-            
-            sample_data = []
-            for sample in samples:
-                sample_data.append({
-                    'Well': sample.well,
-                    'Sample Name': sample.sample_name,
-                    'Type': sample.sample_type,
-                    'Owner': sample.owner,
-                    'Date Added': sample.date_added.strftime('%Y-%m-%d') if sample.date_added else ''
-                })
-            
-            df_samples = pd.DataFrame(sample_data)
-            st.dataframe(df_samples, use_container_width=True)
-        else:
-            st.info(f"No samples found in box {box.box_name or box.id}.")
+    
+    # Create heatmap
+    fig = go.Figure(data=go.Heatmap(
+        z=heatmap_data,
+        x=_col_labels(box_cols),
+        y=_row_labels(box_rows),
+        colorscale=[[0, 'white'], [1, 'green']],
+        showscale=False
+    ))
+    
+    fig.update_layout(
+        title=f"Sample Density in Box {box_label}",
+        xaxis_title="Column",
+        yaxis_title="Row",
+        annotations=annotations
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Display sample list
+    if not df_samples.empty:
+        st.subheader(f"Samples in Box {box_label}")
+        st.dataframe(df_samples, use_container_width=True)
+    else:
+        st.info(f"No samples found in box {box_label}.")
 
 def display_species_distribution():
     """Display species distribution analysis"""
@@ -644,16 +749,9 @@ def display_species_distribution():
         
         # Species bar chart
         species_summary = df.groupby('Species')['Count'].sum().reset_index()
-        species_summary = species_summary.sort_values('Count', ascending=False)
         
         # Limit to top 15 species for readability
-        if len(species_summary) > 15:
-            other_count = species_summary.iloc[15:]['Count'].sum()
-            species_summary = species_summary.iloc[:15]
-            species_summary = pd.concat([
-                species_summary, 
-                pd.DataFrame([{'Species': 'Other', 'Count': other_count}])
-            ])
+        species_summary = _top_n_with_other(species_summary, 'Species', 15)
         
         fig = px.bar(
             species_summary,
@@ -1,11 +1,14 @@
 import os
+import atexit
+from functools import lru_cache
+import httpx
 import streamlit as st
 from supabase import create_client, Client
 from dotenv import load_dotenv
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert, text
 from sqlalchemy.orm import sessionmaker
-from model import Base
+from model import Base, Sample
 
 # Load environment variables
 load_dotenv()
@@ -14,13 +17,88 @@ load_dotenv()
 # SQLite Database Functions #
 #############################
 
+# Defaults to the local SQLite file; set DATABASE_URL to use Postgres instead
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///samples.db")
+
+# Pool settings for a hosted Postgres (e.g. Supabase, 15 connections on the
+# free tier). Every Streamlit worker gets its own pool, so keep each one small.
+PG_POOL_SETTINGS = {
+    "pool_size": 3,
+    "max_overflow": 2,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+    "pool_timeout": 30,
+}
+
+def _pg_connect_args(db_path):
+    """Turn off server-side prepared statements for the Postgres driver in use
+    
+    Supabase's transaction pooler hands each transaction to a different
+    backend connection, so a statement prepared on one is missing on the next.
+    """
+    if db_path.startswith("postgresql+psycopg:"):
+        return {"prepare_threshold": None}
+    # psycopg2 never prepares statements server-side
+    return {}
+
 # --- Setup the SQLite database ---
-def init_db(db_path="sqlite:///samples.db"):
+def init_db(db_path=DATABASE_URL):
     """Initialize the database and create all tables"""
-    engine = create_engine(db_path, echo=False, connect_args={"check_same_thread": False})
+    if db_path.startswith("sqlite"):
+        # SQLAlchemy 2.0 pools file-based SQLite connections (QueuePool), so
+        # connections are reused rather than reopened per session. A single
+        # StaticPool connection would let sessions on different threads share
+        # one transaction.
+        engine = create_engine(db_path, echo=False, connect_args={"check_same_thread": False})
+        if ":memory:" not in db_path:
+            _configure_sqlite(engine)
+    else:
+        engine = create_engine(db_path, echo=False, connect_args=_pg_connect_args(db_path), **PG_POOL_SETTINGS)
     Base.metadata.create_all(engine)
+    create_missing_indexes(engine)
     return sessionmaker(bind=engine)
 
+def _configure_sqlite(engine):
+    """Use WAL journaling so readers don't block behind writers
+    
+    Every Streamlit session thread shares the samples.db file. With WAL and
+    synchronous=NORMAL a commit needs one fsync instead of two, and busy_timeout
+    makes a writer wait for the lock rather than fail straight away.
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
+    
+    def optimize():
+        """Refresh the query planner statistics on shutdown"""
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("PRAGMA optimize"))
+        except Exception as e:
+            print(f"PRAGMA optimize failed: {e}")
+    
+    atexit.register(optimize)
+
+def create_missing_indexes(engine):
+    """Add indexes defined on the models to tables that already existed
+    
+    create_all only creates indexes together with new tables, so databases
+    created before an index was added need it added here.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(engine, checkfirst=True)
+            except Exception as e:
+                # e.g. existing duplicate rows block a unique index
+                print(f"Could not create index {index.name}: {e}")
+
 # Create the session factory
 SessionLocal = init_db()
 
@@ -37,9 +115,58 @@ def get_db_session():
     finally:
         session.close()
 
+def insert_if_missing(session, model, **values):
+    """Insert a row unless its primary key is taken; returns True if it was inserted
+    
+    Does the existence check and insert in one INSERT ... ON CONFLICT DO NOTHING
+    instead of a SELECT followed by an INSERT.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(model).values(**values).on_conflict_do_nothing()
+    return session.execute(stmt).rowcount > 0
+
+# Cached reads of freezers, racks, boxes and samples, cleared together after writes
+_inventory_caches = []
+
+def inventory_cache(cached):
+    """Register a cached reader so invalidate_inventory_caches() clears it"""
+    _inventory_caches.append(cached)
+    return cached
+
+def invalidate_inventory_caches():
+    """Clear every registered inventory cache; call after committing a write"""
+    for cached in _inventory_caches:
+        # st.cache_data exposes clear(), functools.lru_cache cache_clear()
+        if hasattr(cached, "cache_clear"):
+            cached.cache_clear()
+        else:
+            cached.clear()
+
+def add_samples_bulk(rows, session=None):
+    """Insert many samples in one executemany; returns the new ids in row order
+    
+    rows is a list of dicts keyed by Sample column name, all with the same keys.
+    Pass a session to make the insert part of its transaction; otherwise one is
+    opened and committed, so the whole batch costs a single commit.
+    """
+    if not rows:
+        return []
+    if session is None:
+        with get_db_session() as session:
+            return add_samples_bulk(rows, session)
+    stmt = insert(Sample).returning(Sample.id, sort_by_parameter_order=True)
+    return session.connection().execute(stmt, rows).scalars().all()
+
 def backup_sqlite_database(backup_dir="backups"):
-    """Create a backup of the SQLite database"""
-    import shutil
+    """Create a backup of the SQLite database
+    
+    Uses SQLite's online backup API, which copies pages under a read lock so
+    writes in progress can't leave a torn copy.
+    """
+    import sqlite3
     from datetime import datetime
     
     # Create backup directory if it doesn't exist
@@ -50,9 +177,15 @@ def backup_sqlite_database(backup_dir="backups"):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_file = os.path.join(backup_dir, f"samples_backup_{timestamp}.db")
     
-    # Copy the database file
+    # Copy the database pages in batches
     try:
-        shutil.copy2("samples.db", backup_file)
+        src = sqlite3.connect("samples.db")
+        dst = sqlite3.connect(backup_file)
+        try:
+            src.backup(dst, pages=1024)
+        finally:
+            dst.close()
+            src.close()
         print(f"Database backed up to {backup_file}")
         return True
     except Exception as e:
@@ -63,7 +196,8 @@ def backup_sqlite_database(backup_dir="backups"):
 # Supabase Database Functions #
 #############################
 
-# Get Supabase credentials from environment variables or secrets
+# Get Supabase credentials from environment variables or secrets; read once per process
+@lru_cache(maxsize=1)
 def get_supabase_credentials():
     """Get Supabase credentials from environment variables or Streamlit secrets"""
     # Try to get from Streamlit secrets first (for production)
@@ -79,20 +213,50 @@ def get_supabase_credentials():
     
     return url, key, service_key
 
-# Create Supabase client
-def get_supabase_client(use_service_key=False) -> Client:
-    """Get a Supabase client instance"""
+# Connection pool settings for the PostgREST HTTP session
+POOL_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50)
+POOL_TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+
+def _pool_postgrest_session(client):
+    """Swap the PostgREST session for a pooled keep-alive httpx.Client"""
+    old_session = client.postgrest.session
+    # HTTP/2 multiplexes concurrent requests (e.g. the backup workers) over one connection
+    pooled = httpx.Client(
+        base_url=old_session.base_url,
+        headers=old_session.headers,
+        # Keep the settings postgrest built its own client with
+        follow_redirects=old_session.follow_redirects,
+        verify=getattr(client.postgrest, "verify", True),
+        http2=True,
+        limits=POOL_LIMITS,
+        timeout=POOL_TIMEOUT
+    )
+    client.postgrest.session = pooled
+    old_session.close()
+    
+    # Close the pool on interpreter shutdown
+    atexit.register(pooled.close)
+    return client
+
+# Create Supabase client once per process; Streamlit reruns reuse it
+@st.cache_resource
+def _get_client(use_service_key=False) -> Client:
+    """Create a Supabase client that survives across reruns and sessions"""
     url, key, service_key = get_supabase_credentials()
     
     # Use service key for admin operations if requested
     if use_service_key:
-        return create_client(url, service_key)
+        return _pool_postgrest_session(create_client(url, service_key))
     
-    return create_client(url, key)
+    return _pool_postgrest_session(create_client(url, key))
+
+def get_supabase_client(use_service_key=False) -> Client:
+    """Get a Supabase client instance"""
+    return _get_client(use_service_key)
 
 @contextmanager
 def get_supabase_session(use_service_key=False):
-    """Context manager for Supabase client sessions"""
+    """Context manager for Supabase client sessions (yields the cached client)"""
     client = get_supabase_client(use_service_key)
     try:
         yield client
@@ -110,21 +274,83 @@ def init_supabase_tables():
     # Here we'll just check if we can connect to Supabase
     try:
         with get_supabase_session(use_service_key=True) as supabase:
-            # Test the connection
-            response = supabase.table("users").select("count", count="exact").execute()
+            # Test the connection; only the count header is needed, so fetch at most one row
+            response = supabase.table("users").select("id", count="exact").limit(1).execute()
             print(f"Connected to Supabase successfully. User count: {response.count}")
             return True
     except Exception as e:
         print(f"Failed to connect to Supabase: {e}")
         return False
 
+# Tables exported by backup_supabase_database, with the columns that give each a stable page order
+BACKUP_TABLES = {
+    "users": ("id",),
+    "freezers": ("name",),
+    "racks": ("id",),
+    "boxes": ("freezer_name", "rack_id", "id"),
+    "samples": ("id",),
+    "sample_history": ("id",),
+}
+BACKUP_PAGE_SIZE = 1000
+
+def _write_rows(f, rows):
+    """Serialise a page of rows as newline-delimited JSON and write it in one call"""
+    import orjson
+    f.write(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+
+def _dump_table(supabase, table, order_by, backup_file):
+    """Page through a table and write it as newline-delimited JSON; returns the row count"""
+    from concurrent.futures import ThreadPoolExecutor
+    
+    row_count = 0
+    pending = None
+    # A single writer thread serialises and writes one page while the next is fetched
+    with open(backup_file, 'wb') as f, ThreadPoolExecutor(max_workers=1) as writer:
+        while True:
+            query = supabase.table(table).select("*")
+            for column in order_by:
+                query = query.order(column)
+            rows = query.range(row_count, row_count + BACKUP_PAGE_SIZE - 1).execute().data or []
+            
+            # At most one page waits to be written, so memory stays bounded
+            if pending is not None:
+                pending.result()
+            pending = writer.submit(_write_rows, f, rows)
+            row_count += len(rows)
+            
+            if len(rows) < BACKUP_PAGE_SIZE:
+                pending.result()
+                return row_count
+
+def _stream_table(table, order_by, backup_file):
+    """Stream a table from DATABASE_URL through a server-side cursor into newline-delimited JSON"""
+    import orjson
+    
+    engine = SessionLocal.kw["bind"]
+    sa_table = Base.metadata.tables[table]
+    query = sa_table.select().order_by(*[sa_table.c[column] for column in order_by])
+    
+    row_count = 0
+    with engine.connect() as conn, open(backup_file, 'wb') as f:
+        # yield_per fetches from the cursor in batches instead of buffering the whole result
+        result = conn.execution_options(stream_results=True, yield_per=BACKUP_PAGE_SIZE).execute(query)
+        for row in result.mappings():
+            f.write(orjson.dumps(dict(row), default=str) + b"\n")
+            row_count += 1
+    return row_count
+
 def backup_supabase_database(backup_dir="backups"):
     """
     Create a backup of the Supabase database
     
     For Supabase, you can use their built-in backup system or
-    export data to JSON/CSV files
+    export data to JSON/CSV files. Tables are exported concurrently, one
+    newline-delimited JSON file per table. When DATABASE_URL points at the
+    Postgres database, the sample tables are read from it directly instead of
+    being paged through the REST API.
     """
+    from concurrent.futures import ThreadPoolExecutor
+    
     try:
         # Create backup directory if it doesn't exist
         if not os.path.exists(backup_dir):
@@ -134,20 +360,22 @@ def backup_supabase_database(backup_dir="backups"):
         from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Export tables to JSON files
-        tables = ["users", "freezers", "racks", "boxes", "samples", "sample_history"]
-        
+        # Export tables in parallel; the client's HTTP pool is shared by the workers
         with get_supabase_session(use_service_key=True) as supabase:
-            for table in tables:
-                response = supabase.table(table).select("*").execute()
+            with ThreadPoolExecutor(max_workers=len(BACKUP_TABLES)) as executor:
+                futures = {}
+                direct = not DATABASE_URL.startswith("sqlite")
+                for table, order_by in BACKUP_TABLES.items():
+                    backup_file = os.path.join(backup_dir, f"{table}_backup_{timestamp}.jsonl")
+                    if direct and table in Base.metadata.tables:
+                        future = executor.submit(_stream_table, table, order_by, backup_file)
+                    else:
+                        future = executor.submit(_dump_table, supabase, table, order_by, backup_file)
+                    futures[table] = (backup_file, future)
                 
-                if hasattr(response, "data"):
-                    import json
-                    backup_file = os.path.join(backup_dir, f"{table}_backup_{timestamp}.json")
-                    with open(backup_file, 'w') as f:
-                        json.dump(response.data, f, indent=2)
-                    
-                    print(f"Table {table} backed up to {backup_file}")
+                for table, (backup_file, future) in futures.items():
+                    row_count = future.result()
+                    print(f"Table {table} backed up to {backup_file} ({row_count} rows)")
         
         return True
     except Exception as e:
@@ -185,6 +413,14 @@ def create_user(user_data):
         response = supabase.table("users").insert(user_data).execute()
         return response.data[0] if response.data else None
 
+def upsert_users(users_data):
+    """Insert several users in one request, skipping usernames that already exist"""
+    with get_supabase_session(use_service_key=True) as supabase:
+        response = supabase.table("users").upsert(
+            users_data, on_conflict="username", ignore_duplicates=True
+        ).execute()
+        return response.data or []
+
 def update_user(user_id, user_data):
     """Update a user"""
     with get_supabase_session(use_service_key=True) as supabase:
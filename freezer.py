@@ -1,25 +1,31 @@
 import streamlit as st
-from db_utils import get_db_session
-from model import Freezer
+from sqlalchemy import delete, select
+from model import Freezer, Rack, Box, Sample
 from common import handle_delete_confirmation
+from db_utils import get_db_session, insert_if_missing, inventory_cache, invalidate_inventory_caches
 
-def display_freezer_selection():
+def display_freezer_selection(session):
     """Display the freezer selection interface"""
+    freezer_expanded = st.session_state.selected_freezer is None
+    with st.expander("1⃣ Select Freezer" if freezer_expanded else f"✅ Freezer: {st.session_state.selected_freezer}", expanded=freezer_expanded):
+        display_freezer_list()
+        add_new_freezer(session)
+        
+        if st.session_state.selected_freezer:
+            handle_freezer_deletion(st.session_state.selected_freezer)
+
+@inventory_cache
+@st.cache_data(ttl=60)
+def list_freezers():
+    """Names of all freezers, cached across reruns until a freezer is added or deleted"""
     with get_db_session() as session:
-        freezer_expanded = st.session_state.selected_freezer is None
-        with st.expander("1⃣ Select Freezer" if freezer_expanded else f"✅ Freezer: {st.session_state.selected_freezer}", expanded=freezer_expanded):
-            display_freezer_list(session)
-            add_new_freezer(session)
-            
-            if st.session_state.selected_freezer:
-                handle_freezer_deletion(st.session_state.selected_freezer)
+        return session.execute(select(Freezer.name).order_by(Freezer.name)).scalars().all()
 
-def display_freezer_list(session):
+def display_freezer_list():
     """Display the list of freezers as buttons"""
-    freezers = session.query(Freezer).order_by(Freezer.name).all()
-    for fz in freezers:
-        if st.button(f"🧊 {fz.name}", key=f"btn_freezer_{fz.name}"):
-            st.session_state.selected_freezer = fz.name
+    for name in list_freezers():
+        if st.button(f"🧊 {name}", key=f"btn_freezer_{name}"):
+            st.session_state.selected_freezer = name
             st.session_state.selected_rack = None
             st.session_state.selected_box = None
             st.session_state.selected_well = None
@@ -31,10 +37,9 @@ def add_new_freezer(session):
         new_freezer = st.text_input("Add New Freezer")
         add_submit = st.form_submit_button("Add Freezer")
         if add_submit and new_freezer:
-            existing = session.query(Freezer).filter_by(name=new_freezer.strip()).first()
-            if not existing:
-                session.add(Freezer(name=new_freezer.strip()))
+            if insert_if_missing(session, Freezer, name=new_freezer.strip()):
                 session.commit()
+                invalidate_inventory_caches()
                 st.success(f"Added freezer '{new_freezer.strip()}'")
                 st.rerun()
             else:
@@ -43,11 +48,15 @@ def add_new_freezer(session):
 def handle_freezer_deletion(freezer_name):
     """Handle the deletion of a freezer with confirmation"""
     def delete_freezer(session, freezer_name, **kwargs):
-        """Delete a freezer from the database"""
-        freezer_to_delete = session.query(Freezer).filter_by(name=freezer_name).first()
-        if freezer_to_delete:
-            session.delete(freezer_to_delete)
+        """Delete a freezer and everything stored in it from the database"""
+        # One DELETE per table rather than the ORM cascade's one per row.
+        # SQLite runs with foreign keys off, so children are removed explicitly.
+        for model, column in ((Sample, Sample.freezer_name), (Box, Box.freezer_name), (Rack, Rack.freezer_name)):
+            session.execute(delete(model).where(column == freezer_name), execution_options={"synchronize_session": False})
+        deleted = session.execute(delete(Freezer).where(Freezer.name == freezer_name)).rowcount
+        if deleted:
             session.commit()
+            invalidate_inventory_caches()
             # Reset session state
             st.session_state.selected_freezer = None
             st.session_state.selected_rack = None
@@ -17,5 +17,10 @@ if __name__ == "__main__":
     with get_db_session() as session:
         print("Database initialized with all tables.")
     
+    # Samples can be loaded in bulk with a single commit, e.g.
+    #   from db_utils import add_samples_bulk
+    #   add_samples_bulk([{"sample_name": "S1", "well": "A1", "freezer": "F1", "rack": "R1", "box": "B1",
+    #                      "freezer_name": "F1", "rack_id": "R1", "box_id": "B1"}, ...])
+    
     # Create a backup
     backup_database()
\ No newline at end of file
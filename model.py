@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, ForeignKeyConstraint
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, ForeignKeyConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -18,6 +18,11 @@ class Rack(Base):
     rows = Column(Integer)
     columns = Column(Integer)
 
+    __table_args__ = (
+        # Racks are listed per freezer in id order
+        Index("ix_rack_freezer", "freezer_name", "id"),
+    )
+
     freezer = relationship("Freezer", back_populates="racks")
     boxes = relationship("Box", back_populates="rack", cascade="all, delete-orphan")
 
@@ -34,6 +39,11 @@ class Box(Base):
     rows = Column(Integer)
     columns = Column(Integer)
 
+    __table_args__ = (
+        # Boxes are listed per freezer and rack; the primary key starts with id
+        Index("ix_box_location", "freezer_name", "rack_id"),
+    )
+
     rack = relationship("Rack", back_populates="boxes")
     samples = relationship("Sample", back_populates="box_ref", cascade="all, delete-orphan")
 
@@ -71,6 +81,13 @@ class Sample(Base):
             ['boxes.id', 'boxes.rack_id', 'boxes.freezer_name'],
             ondelete="CASCADE"
         ),
+        # One sample per well; also serves the location lookups
+        Index("ix_sample_location", "freezer", "rack", "box", "well", unique=True),
+        # Box.samples and the box cascade look samples up by the foreign key
+        Index("ix_sample_box", "freezer_name", "rack_id", "box_id"),
+        # Dashboard filters and groupings
+        Index("ix_sample_date_added", "date_added"),
+        Index("ix_sample_type", "sample_type"),
     )
     
     box_ref = relationship("Box", back_populates="samples")
\ No newline at end of file
@@ -1,31 +1,42 @@
 import streamlit as st
-from db_utils import get_db_session
-from model import Rack
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from model import Rack, Box
 from common import handle_delete_confirmation
+from db_utils import get_db_session, insert_if_missing, inventory_cache, invalidate_inventory_caches
 
-def display_rack_selection():
+def display_rack_selection(session):
     """Display the rack selection interface if a freezer is selected"""
     if not st.session_state.selected_freezer:
         return
     
+    rack_expanded = st.session_state.selected_rack is None
+    with st.expander("2⃣ Select Rack" if rack_expanded else f"✅ Rack: {st.session_state.selected_rack}", expanded=rack_expanded):
+        display_rack_list()
+        add_new_rack(session)
+        
+        if st.session_state.selected_rack:
+            handle_rack_deletion(st.session_state.selected_rack)
+
+@inventory_cache
+@st.cache_data(ttl=60)
+def list_racks(freezer_name):
+    """Racks in a freezer as plain dicts, cached until a rack is added or deleted"""
     with get_db_session() as session:
-        rack_expanded = st.session_state.selected_rack is None
-        with st.expander("2⃣ Select Rack" if rack_expanded else f"✅ Rack: {st.session_state.selected_rack}", expanded=rack_expanded):
-            display_rack_list(session)
-            add_new_rack(session)
-            
-            if st.session_state.selected_rack:
-                handle_rack_deletion(st.session_state.selected_rack)
+        racks = session.execute(
+            select(Rack.id, Rack.rows, Rack.columns).filter_by(freezer_name=freezer_name).order_by(Rack.id)
+        ).mappings().all()
+    return [dict(r) for r in racks]
 
-def display_rack_list(session):
+def display_rack_list():
     """Display the list of racks in the selected freezer as buttons"""
-    racks = session.query(Rack).filter_by(freezer_name=st.session_state.selected_freezer).order_by(Rack.id).all()
+    racks = list_racks(st.session_state.selected_freezer)
     if not racks:
         st.warning("No racks in this freezer.")
     else:
         for rack in racks:
-            if st.button(f"📦 {rack.id} ({rack.rows}x{rack.columns})", key=f"btn_rack_{rack.id}"):
-                st.session_state.selected_rack = rack.id
+            if st.button(f"📦 {rack['id']} ({rack['rows']}x{rack['columns']})", key=f"btn_rack_{rack['id']}"):
+                st.session_state.selected_rack = rack['id']
                 st.session_state.selected_box = None
                 st.session_state.selected_well = None
                 st.rerun()
@@ -46,26 +57,30 @@ def add_new_rack(session):
             submit = st.form_submit_button("Add Rack")
 
         if submit and rack_id:
-            existing = session.query(Rack).filter_by(id=rack_id.strip(), freezer_name=st.session_state.selected_freezer).first()
-            if not existing:
-                session.add(Rack(id=rack_id.strip(), freezer_name=st.session_state.selected_freezer, rows=rows, columns=cols))
+            # Rack IDs are the primary key, so they must be unique across all freezers
+            if insert_if_missing(session, Rack, id=rack_id.strip(), freezer_name=st.session_state.selected_freezer, rows=rows, columns=cols):
                 session.commit()
+                invalidate_inventory_caches()
                 st.success(f"Added rack '{rack_id.strip()}'")
                 st.rerun()
             else:
-                st.error(f"Rack '{rack_id.strip()}' already exists in this freezer")
+                st.error(f"Rack '{rack_id.strip()}' already exists")
 
 def handle_rack_deletion(rack_id):
     """Handle the deletion of a rack with confirmation"""
     def delete_rack(session, rack_id, **kwargs):
         """Delete a rack from the database"""
-        rack_to_delete = session.query(Rack).filter_by(
+        # The ORM cascade visits every box and sample; load each level in one query
+        rack_to_delete = session.query(Rack).options(
+            selectinload(Rack.boxes).selectinload(Box.samples)
+        ).filter_by(
             id=rack_id, 
             freezer_name=st.session_state.selected_freezer
         ).first()
         if rack_to_delete:
             session.delete(rack_to_delete)
             session.commit()
+            invalidate_inventory_caches()
             # Reset session state
             st.session_state.selected_rack = None
             st.session_state.selected_box = None
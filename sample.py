@@ -1,73 +1,133 @@
+import io
+import html
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from db_utils import get_db_session
+from functools import lru_cache
+from sqlalchemy import bindparam, delete, update
 from model import Box, Sample
-from data_validation import validate_sample_form, validate_csv_upload, ValidationError, sanitize_input
-from sample_history import log_sample_creation, log_sample_update, log_sample_deletion, log_bulk_sample_changes, display_sample_audit_trail
+from db_utils import get_db_session, add_samples_bulk, inventory_cache, invalidate_inventory_caches
+from data_validation import validate_sample_form, validate_csv_upload, ValidationError, sanitize_input, sanitize_series
+from sample_history import log_sample_creation, log_sample_updates, log_sample_deletion, log_bulk_sample_changes, display_sample_audit_trail
 from auth import require_login
 
+# Panels of the sample management section
+SAMPLE_TABS = ("Box Layout", "Add/Edit Sample", "Bulk Upload", "Sample History")
+
+# Editable sample fields, in the order they appear in the CSV template
+SAMPLE_FIELDS = ("sample_name", "sample_type", "owner", "notes", "species", "resistance", "date_created", "strain", "ogtr", "daff")
+
+@inventory_cache
+@st.cache_data(ttl=30)
+def load_box_samples(freezer, rack, box):
+    """Samples in a box as plain dicts keyed by well; cleared whenever samples change"""
+    with get_db_session() as session:
+        rows = session.query(Sample.id, Sample.well, *[getattr(Sample, col) for col in SAMPLE_FIELDS]).filter_by(
+            freezer=freezer, rack=rack, box=box
+        ).all()
+    return {row.well: row._asdict() for row in rows}
+
 @require_login
-def display_sample_management():
+def display_sample_management(session):
     """Display the sample management interface if a box is selected"""
     if not st.session_state.selected_box:
         return
     
-    with get_db_session() as session:
-        selected_box = session.query(Box).filter_by(
-            id=st.session_state.selected_box,
-            rack_id=st.session_state.selected_rack,
-            freezer_name=st.session_state.selected_freezer
-        ).first()
+    selected_box = session.query(Box).filter_by(
+        id=st.session_state.selected_box,
+        rack_id=st.session_state.selected_rack,
+        freezer_name=st.session_state.selected_freezer
+    ).first()
 
-        if selected_box is None:
-            st.warning(f"No box exists at position {st.session_state.selected_box}. Please add a box first.")
-            st.session_state.selected_box = None
-            st.rerun()
-        else:
-            box_display = selected_box.box_name or selected_box.id
+    if selected_box is None:
+        st.warning(f"No box exists at position {st.session_state.selected_box}. Please add a box first.")
+        st.session_state.selected_box = None
+        st.rerun()
+    else:
+        box_display = selected_box.box_name or selected_box.id
+        
+        with st.expander(f"4⃣ Manage Samples in Box: {box_display}", expanded=True):
+            # A well was just picked in the layout: open the form. This has to
+            # happen before the radio below is created.
+            if st.session_state.get("switch_to_sample_form"):
+                st.session_state.sample_tab = "Add/Edit Sample"
+                st.session_state.switch_to_sample_form = False
             
-            with st.expander(f"4⃣ Manage Samples in Box: {box_display}", expanded=True):
-                # Create tabs
-                tabs = st.tabs(["Box Layout", "Add/Edit Sample", "Bulk Upload", "Sample History"])
-                
-                # If a well was just selected, show a message to click on the Add/Edit Sample tab
-                if "switch_to_sample_form" in st.session_state and st.session_state.switch_to_sample_form:
-                    st.info("Click on the 'Add/Edit Sample' tab to edit.")
-                    st.session_state.switch_to_sample_form = False
-                
-                # Show all tabs normally
-                with tabs[0]:
-                    display_box_layout(session, selected_box)
-                with tabs[1]:
-                    display_sample_form(session, selected_box)
-                with tabs[2]:
-                    display_bulk_upload(session, selected_box)
-                with tabs[3]:
-                    display_box_history(session, selected_box)
+            # Unlike st.tabs, only the chosen panel runs, so hidden panels cost no queries
+            active_tab = st.radio(
+                "Sample panel",
+                SAMPLE_TABS,
+                horizontal=True,
+                key="sample_tab",
+                label_visibility="collapsed"
+            )
+            
+            if active_tab == "Box Layout":
+                display_box_layout(session, selected_box)
+            elif active_tab == "Add/Edit Sample":
+                display_sample_form(session, selected_box)
+            elif active_tab == "Bulk Upload":
+                display_bulk_upload(session, selected_box)
+            else:
+                display_box_history(session, selected_box)
+
+@lru_cache(maxsize=64)
+def _well_grid(rows, cols):
+    """Well labels (A1, A2, ...) for a box of the given size, one tuple per row"""
+    return tuple(tuple(f"{chr(65 + r)}{c + 1}" for c in range(cols)) for r in range(rows))
+
+@lru_cache(maxsize=64)
+def _well_list(rows, cols):
+    """All well labels for a box of the given size, in row order"""
+    return tuple(well for row in _well_grid(rows, cols) for well in row)
+
+def _box_grid_html(box_rows, box_cols, filled, selected_well):
+    """Render the box as one HTML grid; filled wells show the sample name"""
+    cells = []
+    for row in _well_grid(box_rows, box_cols):
+        for well in row:
+            label = filled.get(well, "")
+            if well == selected_well:
+                colour = "#f9c74f"
+            elif label:
+                colour = "#90be6d"
+            else:
+                colour = "#f1f3f5"
+            cells.append(
+                f'<div title="{well}" style="background:{colour};border-radius:4px;padding:6px 2px;'
+                f'text-align:center;font-size:0.75rem;overflow:hidden;white-space:nowrap">'
+                f'{html.escape(label[:10]) if label else well}</div>'
+            )
+    return (
+        f'<div style="display:grid;grid-template-columns:repeat({box_cols}, 1fr);gap:4px">'
+        + "".join(cells)
+        + "</div>"
+    )
 
 def display_box_layout(session, selected_box):
     """Display the box layout with samples as a grid"""
     box_rows, box_cols = selected_box.rows, selected_box.columns
-    samples = session.query(Sample).filter_by(
-        freezer=selected_box.freezer_name,
-        rack=selected_box.rack_id,
-        box=selected_box.id
-    ).all()
-    filled = {s.well: s.sample_name for s in samples}
+    samples = load_box_samples(selected_box.freezer_name, selected_box.rack_id, selected_box.id)
+    filled = {well: s["sample_name"] for well, s in samples.items()}
 
     st.markdown("#### 📊 Box Layout")
-    for r in range(box_rows):
-        cols = st.columns(box_cols)
-        for c_ in range(box_cols):
-            well = f"{chr(65 + r)}{c_ + 1}"
-            label = filled.get(well, "")
-            with cols[c_]:
-                if st.button(label[:10] if label else well, key=f"btn_sample_{well}"):
-                    st.session_state.selected_well = well
-                    # Set flag to switch to the Add/Edit Sample tab
-                    st.session_state.switch_to_sample_form = True
-                    st.rerun()
+    # One markdown element for the whole grid instead of a button per well
+    st.markdown(_box_grid_html(box_rows, box_cols, filled, st.session_state.selected_well), unsafe_allow_html=True)
+    
+    wells = _well_list(box_rows, box_cols)
+    well = st.selectbox(
+        "Select Well",
+        options=wells,
+        index=wells.index(st.session_state.selected_well) if st.session_state.selected_well in wells else None,
+        format_func=lambda w: f"{w}: {filled[w]}" if w in filled else w,
+        placeholder="Choose a well to add or edit a sample"
+    )
+    if well and well != st.session_state.selected_well:
+        st.session_state.selected_well = well
+        # Set flag to switch to the Add/Edit Sample tab
+        st.session_state.switch_to_sample_form = True
+        st.rerun()
 
 def display_sample_form(session, selected_box):
     """Display form to add or edit a sample"""
@@ -76,25 +136,12 @@ def display_sample_form(session, selected_box):
     prefill = {}
     if st.session_state.selected_well:
         st.markdown(f"**Selected Well:** {st.session_state.selected_well}")
-        sample = session.query(Sample).filter_by(
-            freezer=selected_box.freezer_name,
-            rack=selected_box.rack_id,
-            box=selected_box.id,
-            well=st.session_state.selected_well
-        ).first()
+        # Prefill from the box's cached samples rather than querying the well again
+        sample = load_box_samples(selected_box.freezer_name, selected_box.rack_id, selected_box.id).get(
+            st.session_state.selected_well
+        )
         if sample:
-            prefill = {
-                "sample_name": sample.sample_name,
-                "sample_type": sample.sample_type,
-                "owner": sample.owner,
-                "notes": sample.notes,
-                "species": sample.species,
-                "resistance": sample.resistance,
-                "date_created": sample.date_created,
-                "strain": sample.strain,
-                "ogtr": sample.ogtr,
-                "daff": sample.daff
-            }
+            prefill = sample
 
         with st.form("sample_form"):
             row1_col1, row1_col2, row1_col3 = st.columns([2, 1, 1])
@@ -163,10 +210,13 @@ def display_sample_form(session, selected_box):
                 save_sample(session, sample, selected_box, sample_name, sample_type, well, owner, notes, species, resistance, date_created, strain, ogtr, daff)
 
         if st.session_state.selected_well and prefill:
-            handle_sample_deletion(session, selected_box)
+            handle_sample_deletion(session, sample)
 
 def save_sample(session, sample, selected_box, sample_name, sample_type, well, owner, notes, species, resistance, date_created, strain, ogtr, daff):
-    """Save a new sample or update an existing one with validation and history tracking"""
+    """Save a new sample or update an existing one with validation and history tracking
+    
+    sample is the cached dict for the well being edited, or None for a new sample.
+    """
     try:
         # Sanitize inputs
         sample_name = sanitize_input(sample_name)
@@ -188,89 +238,51 @@ def save_sample(session, sample, selected_box, sample_name, sample_type, well, o
             well,
             sample_name,
             sample_type,
-            sample.id if sample else None
+            sample["id"] if sample else None,
+            session=session
         )
         
+        new_values = dict(zip(
+            ("sample_name", "sample_type", "well", "owner", "notes", "species", "resistance", "date_created", "strain", "ogtr", "daff"),
+            (sample_name, sample_type, well, owner, notes, species, resistance, date_created, strain, ogtr, daff)
+        ))
+        
         if sample:
-            # Track changes for history
-            changes = []
-            
-            if sample.sample_name != sample_name:
-                changes.append(("sample_name", sample.sample_name, sample_name))
-            
-            if sample.sample_type != sample_type:
-                changes.append(("sample_type", sample.sample_type, sample_type))
-            
-            if sample.well != well:
-                changes.append(("well", sample.well, well))
-            
-            if sample.owner != owner:
-                changes.append(("owner", sample.owner, owner))
+            # Load the ORM row by primary key only when saving
+            sample = session.get(Sample, sample["id"])
             
-            if sample.notes != notes:
-                changes.append(("notes", sample.notes, notes))
-            
-            if sample.species != species:
-                changes.append(("species", sample.species, species))
-            
-            if sample.resistance != resistance:
-                changes.append(("resistance", sample.resistance, resistance))
-            
-            if sample.date_created != date_created:
-                changes.append(("date_created", sample.date_created, date_created))
-            
-            if sample.strain != strain:
-                changes.append(("strain", sample.strain, strain))
-            
-            if sample.ogtr != ogtr:
-                changes.append(("ogtr", sample.ogtr, ogtr))
-            
-            if sample.daff != daff:
-                changes.append(("daff", sample.daff, daff))
+            # Track changes for history
+            changes = [
+                (field, getattr(sample, field), value)
+                for field, value in new_values.items()
+                if getattr(sample, field) != value
+            ]
             
             # Update sample
-            sample.sample_name = sample_name
-            sample.sample_type = sample_type
-            sample.well = well
-            sample.owner = owner
-            sample.notes = notes
-            sample.species = species
-            sample.resistance = resistance
-            sample.date_created = date_created
-            sample.strain = strain
-            sample.ogtr = ogtr
-            sample.daff = daff
+            for field, value in new_values.items():
+                setattr(sample, field, value)
             
             session.commit()
+            invalidate_inventory_caches()
             
-            # Log changes to history
-            for field, old_value, new_value in changes:
-                log_sample_update(sample, field, old_value, new_value)
+            # Log all changed fields in one insert
+            log_sample_updates(sample, changes)
             
             st.success(f"Sample '{sample_name}' updated in {well}.")
         else:
             # Create new sample
             new_sample = Sample(
-                sample_name=sample_name,
-                sample_type=sample_type,
+                **new_values,
                 freezer=selected_box.freezer_name,
                 rack=selected_box.rack_id,
                 box=selected_box.id,
-                well=well,
-                owner=owner,
-                notes=notes,
-                species=species,
-                resistance=resistance,
-                date_created=date_created,
-                strain=strain,
-                ogtr=ogtr,
-                daff=daff,
                 box_id=selected_box.id,
                 rack_id=selected_box.rack_id,
                 freezer_name=selected_box.freezer_name
             )
             session.add(new_sample)
             session.commit()
+            invalidate_inventory_caches()
             
             # Log sample creation
             log_sample_creation(new_sample)
@@ -283,29 +295,29 @@ def save_sample(session, sample, selected_box, sample_name, sample_type, well, o
     except Exception as e:
         st.error(f"Error saving sample: {str(e)}")
 
-def handle_sample_deletion(session, selected_box):
-    """Handle the deletion of a sample with confirmation and history tracking"""
+def handle_sample_deletion(session, sample):
+    """Handle the deletion of a sample with confirmation and history tracking
+    
+    sample is the cached dict the form was prefilled from.
+    """
     if st.button("Delete Sample"):
-        sample_to_delete = session.query(Sample).filter_by(
-            freezer=selected_box.freezer_name,
-            rack=selected_box.rack_id,
-            box=selected_box.id,
-            well=st.session_state.selected_well
-        ).first()
-        
-        if sample_to_delete:
+        if sample:
             # Ask for confirmation
-            st.warning(f"⚠️ Are you sure you want to delete sample '{sample_to_delete.sample_name}' from {st.session_state.selected_well}?")
+            st.warning(f"⚠️ Are you sure you want to delete sample '{sample['sample_name']}' from {st.session_state.selected_well}?")
             
             col1, col2 = st.columns([1, 3])
             with col1:
                 if st.button("Yes, Delete", key="confirm_delete"):
+                    # Load the ORM row by primary key only when deleting
+                    sample_to_delete = session.get(Sample, sample["id"])
+                    
                     # Log deletion before deleting
                     log_sample_deletion(sample_to_delete)
                     
                     # Delete the sample
                     session.delete(sample_to_delete)
                     session.commit()
+                    invalidate_inventory_caches()
                     
                     st.success(f"Sample deleted from {st.session_state.selected_well}.")
                     st.session_state.selected_well = None
@@ -341,33 +353,24 @@ def display_bulk_upload(session, selected_box):
     st.markdown(f"### 📂 Bulk Upload Samples for {box_display_name}")
     st.write("Download your box in tabular form to quickly update multiple samples. Then reupload to apply changes.")
 
-    all_wells = [f"{chr(65 + r)}{c+1}" for r in range(box_rows) for c in range(box_cols)]
+    all_wells = list(_well_list(box_rows, box_cols))
 
-    samples = session.query(Sample).filter_by(
-        freezer=freezer,
-        rack=rack,
-        box=box
-    ).all()
-    existing = {s.well: s for s in samples}
-
-    columns = ["freezer", "rack", "box", "well", "sample_name", "sample_type", "owner", "notes", "species", "resistance", "date_created", "strain", "ogtr", "daff"]
-    data = []
-    for well in all_wells:
-        s = existing.get(well)
-        if s:
-            data.append([
-                s.freezer, s.rack, s.box, s.well,
-                s.sample_name, s.sample_type, s.owner,
-                s.notes, s.species, s.resistance, s.date_created, s.strain, s.ogtr, s.daff
-            ])
-        else:
-            data.append([freezer, rack, box, well, "", "", "", "", "", "", "", "", "", ""])
+    existing = load_box_samples(freezer, rack, box)
 
-    df = pd.DataFrame(data, columns=columns)
+    # One row per well in layout order; wells without a sample are left blank
+    df = pd.DataFrame.from_records(list(existing.values()), columns=["well", *SAMPLE_FIELDS])
+    df = df.set_index("well").reindex(all_wells).fillna("").rename_axis("well").reset_index()
+    df.insert(0, "freezer", freezer)
+    df.insert(1, "rack", rack)
+    df.insert(2, "box", box)
+    
+    # Write the CSV straight to bytes
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False)
     
     # Use the box name in the file name for downloaded template
     st.download_button("Download CSV Template", 
-                    df.to_csv(index=False).encode("utf-8"), 
+                    buf.getvalue(), 
                     file_name=f"{box_display_name}.csv", 
                     mime="text/csv")
 
@@ -378,8 +381,10 @@ def display_bulk_upload(session, selected_box):
 def process_uploaded_csv(session, uploaded):
     """Process an uploaded CSV file with sample data, validation, and history tracking"""
     try:
-        # Use Latin-1 encoding which we know works
-        df_upload = pd.read_csv(uploaded, encoding='latin1')
+        # Use Latin-1 encoding which we know works. Reading every column as
+        # text skips type inference and keeps values like '2023' from turning
+        # into 2023.0; blank cells stay NaN so they still mean "empty well".
+        df_upload = pd.read_csv(uploaded, encoding='latin1', dtype=str, keep_default_na=True)
         
         # Validate the CSV format and content
         freezer = st.session_state.selected_freezer
@@ -394,73 +399,78 @@ def process_uploaded_csv(session, uploaded):
                 st.error(f"- {error}")
             return
         
+        # Only rows for this box are applied; drop the rest before any further work
+        df_box = df_upload[
+            (df_upload["freezer"] == freezer) & (df_upload["rack"] == rack) & (df_upload["box"] == box)
+        ].reset_index(drop=True)
+        if df_box.empty:
+            st.warning(f"The uploaded file has no rows for box {box}.")
+            return
+        
+        # Load every sample already in the box with one query instead of one per row
+        existing = {
+            row.well: row._asdict()
+            for row in session.query(Sample.id, Sample.freezer, Sample.rack, Sample.box, Sample.well, *[getattr(Sample, col) for col in SAMPLE_FIELDS]).filter_by(
+                freezer=freezer, rack=rack, box=box
+            )
+        }
+        
+        # Rows with no sample name clear their well
+        named = df_box["sample_name"].notna() & (df_box["sample_name"].astype(str).str.strip() != "")
+        
+        # Sanitize inputs
+        df_new = df_box.loc[named, ["well", *SAMPLE_FIELDS]].copy()
+        for col in SAMPLE_FIELDS:
+            df_new[col] = sanitize_series(df_new[col])
+        
+        # Line the upload up with the stored samples by well and compare every field at once
+        df_existing = pd.DataFrame(list(existing.values()), columns=["id", "well", *SAMPLE_FIELDS])
+        merged = df_new.merge(df_existing, on="well", how="left", suffixes=("", "_old"), indicator=True)
+        new_values = merged[list(SAMPLE_FIELDS)].to_numpy(dtype=object)
+        old_values = merged[[f"{col}_old" for col in SAMPLE_FIELDS]].to_numpy(dtype=object)
+        is_new = (merged["_merge"] == "left_only").to_numpy()
+        changed = (new_values != old_values) & ~is_new[:, None]
+        
+        insert_rows = [
+            {"freezer": freezer, "rack": rack, "box": box, **values, "box_id": box, "rack_id": rack, "freezer_name": freezer}
+            for values in merged.loc[is_new, ["well", *SAMPLE_FIELDS]].to_dict("records")
+        ]
+        
         # Track changes for history
-        added_samples = []
+        update_rows = []
         updated_samples = []
-        deleted_samples = []
+        for i in np.flatnonzero(changed.any(axis=1)):
+            values = dict(zip(SAMPLE_FIELDS, new_values[i]))
+            sample_id = int(merged["id"].iat[i])
+            update_rows.append({"id": sample_id, **values})
+            snapshot = Sample(id=sample_id, freezer=freezer, rack=rack, box=box, well=merged["well"].iat[i], **values)
+            updated_samples.extend(
+                (snapshot, col, old_values[i, j], new_values[i, j])
+                for j, col in enumerate(SAMPLE_FIELDS) if changed[i, j]
+            )
         
-        # Process the uploaded data
-        for _, row in df_upload.iterrows():
-            # Skip rows that don't match our box
-            if row["freezer"] != freezer or row["rack"] != rack or row["box"] != box:
-                continue
-                
-            existing_sample = session.query(Sample).filter_by(
-                freezer=row["freezer"], rack=row["rack"], box=row["box"], well=row["well"]
-            ).first()
-
-            if pd.isna(row["sample_name"]) or str(row["sample_name"]).strip() == "":
-                # Delete sample if name is empty
-                if existing_sample:
-                    deleted_samples.append(existing_sample)
-                    session.delete(existing_sample)
-            else:
-                # Sanitize inputs
-                for col in ["sample_name", "sample_type", "owner", "notes", "species", "resistance", "date_created", "strain", "ogtr", "daff"]:
-                    if col in row:
-                        row[col] = sanitize_input(row[col])
-                
-                if existing_sample:
-                    # Track changes
-                    changes = []
-                    for col in ["sample_name", "sample_type", "owner", "notes", "species", "resistance", "date_created", "strain", "ogtr", "daff"]:
-                        old_value = getattr(existing_sample, col)
-                        new_value = row[col]
-                        if old_value != new_value:
-                            changes.append((existing_sample, col, old_value, new_value))
-                    
-                    # Update sample
-                    for col in ["sample_name", "sample_type", "owner", "notes", "species", "resistance", "date_created", "strain", "ogtr", "daff"]:
-                        setattr(existing_sample, col, row[col])
-                    
-                    if changes:
-                        updated_samples.extend(changes)
-                else:
-                    # Create new sample
-                    new_s = Sample(
-                        freezer=row["freezer"],
-                        rack=row["rack"],
-                        box=row["box"],
-                        well=row["well"],
-                        sample_name=row["sample_name"],
-                        sample_type=row["sample_type"],
-                        owner=row["owner"],
-                        notes=row["notes"],
-                        species=row["species"],
-                        resistance=row["resistance"],
-                        date_created=row["date_created"],
-                        strain=row["strain"],
-                        ogtr=row["ogtr"],
-                        daff=row["daff"],
-                        box_id=row["box"],
-                        rack_id=row["rack"],
-                        freezer_name=row["freezer"]
-                    )
-                    session.add(new_s)
-                    added_samples.append(new_s)
+        deleted = [existing[well] for well in df_box.loc[~named, "well"] if well in existing]
+        delete_ids = [sample["id"] for sample in deleted]
+        deleted_samples = [Sample(**sample) for sample in deleted]
         
-        # Commit changes
+        # Apply all changes as Core executemany statements on the session's
+        # connection, skipping the ORM unit of work, then commit once
+        conn = session.connection()
+        for row, new_id in zip(insert_rows, add_samples_bulk(insert_rows, session)):
+            row["id"] = new_id
+        if update_rows:
+            # The SET clause comes from the remaining keys of each parameter dict
+            conn.execute(
+                update(Sample).where(Sample.id == bindparam("_id")),
+                [{"_id": row["id"], **{col: row[col] for col in SAMPLE_FIELDS}} for row in update_rows]
+            )
+        if delete_ids:
+            conn.execute(delete(Sample).where(Sample.id.in_(delete_ids)))
         session.commit()
+        invalidate_inventory_caches()
+        
+        # History only needs plain values
+        added_samples = [Sample(**row) for row in insert_rows]
         
         # Log changes to history
         log_bulk_sample_changes(added_samples, updated_samples, deleted_samples)
@@ -469,6 +479,7 @@ def process_uploaded_csv(session, uploaded):
         st.success(f"Sample data updated successfully: {len(added_samples)} added, {len(updated_samples)} updated, {len(deleted_samples)} deleted.")
         st.rerun()
     except Exception as e:
+        session.rollback()
         st.error(f"Upload failed: {e}")
         import traceback
         st.error(traceback.format_exc())
@@ -477,31 +488,24 @@ def display_box_history(session, selected_box):
     """Display history for samples in the selected box"""
     st.subheader(f"Sample History for Box: {selected_box.box_name or selected_box.id}")
     
-    # Get samples in this box
-    samples = session.query(Sample).filter_by(
-        freezer=selected_box.freezer_name,
-        rack=selected_box.rack_id,
-        box=selected_box.id
-    ).all()
+    # Get samples in this box, already keyed by well
+    by_well = load_box_samples(selected_box.freezer_name, selected_box.rack_id, selected_box.id)
     
-    if not samples:
+    if not by_well:
         st.info("No samples found in this box.")
         return
     
     # Create a selection for which sample to view history for
-    sample_options = [f"{s.well}: {s.sample_name}" for s in samples]
-    selected_sample_display = st.selectbox(
+    selected_well = st.selectbox(
         "Select Sample to View History",
-        options=[""] + sample_options
+        options=[""] + list(by_well),
+        format_func=lambda well: f"{well}: {by_well[well]['sample_name']}" if well else ""
     )
     
-    if selected_sample_display:
-        # Extract well from display name
-        well = selected_sample_display.split(":")[0].strip()
-        
+    if selected_well:
         # Find the sample
-        sample = next((s for s in samples if s.well == well), None)
+        sample = by_well.get(selected_well)
         
         if sample:
             # Display audit trail for this sample
-            display_sample_audit_trail(sample)
\ No newline at end of file
+            display_sample_audit_trail(sample["id"], sample["sample_name"])
\ No newline at end of file
@@ -26,6 +26,37 @@ class SampleHistory(Base):
     well = Column(String)
     sample_name = Column(String)
 
+def _current_user():
+    """(user_id, username) to record against history entries"""
+    if "user_id" not in st.session_state or st.session_state.user_id is None:
+        return 0, "System"
+    return st.session_state.user_id, st.session_state.username
+
+def _history_row(sample, action, user, field=None, old_value=None, new_value=None):
+    """Column values for one history entry"""
+    user_id, username = user
+    return {
+        "sample_id": sample.id,
+        "action": action,
+        "field": field,
+        "old_value": str(old_value) if old_value is not None else None,
+        "new_value": str(new_value) if new_value is not None else None,
+        "user_id": user_id,
+        "username": username,
+        "freezer": sample.freezer,
+        "rack": sample.rack,
+        "box": sample.box,
+        "well": sample.well,
+        "sample_name": sample.sample_name
+    }
+
+def _write_history(rows):
+    """Insert history entries in one executemany and a single commit"""
+    if not rows:
+        return
+    with get_db_session() as session:
+        session.bulk_insert_mappings(SampleHistory, rows)
+
 def log_sample_action(sample, action, field=None, old_value=None, new_value=None):
     """
     Log a sample action to the history table
@@ -37,30 +68,7 @@ def log_sample_action(sample, action, field=None, old_value=None, new_value=None
     - old_value: The previous value (for updates)
     - new_value: The new value (for updates)
     """
-    if "user_id" not in st.session_state or st.session_state.user_id is None:
-        user_id = 0
-        username = "System"
-    else:
-        user_id = st.session_state.user_id
-        username = st.session_state.username
-    
-    with get_db_session() as session:
-        history_entry = SampleHistory(
-            sample_id=sample.id,
-            action=action,
-            field=field,
-            old_value=str(old_value) if old_value is not None else None,
-            new_value=str(new_value) if new_value is not None else None,
-            user_id=user_id,
-            username=username,
-            freezer=sample.freezer,
-            rack=sample.rack,
-            box=sample.box,
-            well=sample.well,
-            sample_name=sample.sample_name
-        )
-        session.add(history_entry)
-        session.commit()
+    _write_history([_history_row(sample, action, _current_user(), field, old_value, new_value)])
 
 def log_sample_creation(sample):
     """Log the creation of a new sample"""
@@ -70,27 +78,35 @@ def log_sample_update(sample, field, old_value, new_value):
     """Log an update to a sample field"""
     log_sample_action(sample, "updated", field, old_value, new_value)
 
+def log_sample_updates(sample, changes):
+    """Log several field updates to one sample; changes is a list of (field, old_value, new_value)"""
+    user = _current_user()
+    _write_history([
+        _history_row(sample, "updated", user, field, old_value, new_value)
+        for field, old_value, new_value in changes
+    ])
+
 def log_sample_deletion(sample):
     """Log the deletion of a sample"""
     log_sample_action(sample, "deleted")
 
 def log_bulk_sample_changes(added, updated, deleted):
     """
-    Log bulk changes to samples
+    Log bulk changes to samples in a single insert
     
     Parameters:
     - added: List of new Sample objects
     - updated: List of (sample, field, old_value, new_value) tuples
     - deleted: List of deleted Sample objects
     """
-    for sample in added:
-        log_sample_creation(sample)
-    
-    for sample, field, old_value, new_value in updated:
-        log_sample_update(sample, field, old_value, new_value)
-    
-    for sample in deleted:
-        log_sample_deletion(sample)
+    user = _current_user()
+    rows = [_history_row(sample, "created", user) for sample in added]
+    rows.extend(
+        _history_row(sample, "updated", user, field, old_value, new_value)
+        for sample, field, old_value, new_value in updated
+    )
+    rows.extend(_history_row(sample, "deleted", user) for sample in deleted)
+    _write_history(rows)
 
 @require_login
 def display_sample_history():
@@ -259,19 +275,19 @@ def display_filtered_history(filter_action, filter_user, date_range,
         st.warning("Unable to display sample history. The history tracking system may not be fully initialized.")
         st.info("Run `python init_db.py` to create all required tables.")
 
-def display_sample_audit_trail(sample):
+def display_sample_audit_trail(sample_id, sample_name):
     """Display the audit trail for a specific sample"""
     try:
         with get_db_session() as session:
             history_entries = session.query(SampleHistory).filter_by(
-                sample_id=sample.id
+                sample_id=sample_id
             ).order_by(SampleHistory.timestamp.desc()).all()
             
             if not history_entries:
                 st.info("No history available for this sample.")
                 return
             
-            st.subheader(f"Audit Trail for {sample.sample_name}")
+            st.subheader(f"Audit Trail for {sample_name}")
             
             # Convert to DataFrame for display
             data = []
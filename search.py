@@ -2,12 +2,13 @@ import streamlit as st
 import pandas as pd
 import json
 from datetime import datetime
-from db_utils import get_db_session
-from model import Sample, Freezer, Rack, Box
+from model import Sample, Box
+from freezer import list_freezers
+from rack import list_racks
 from auth import require_login
 
 @require_login
-def display_search_interface():
+def display_search_interface(session):
     """Display the search interface and handle search functionality"""
     st.markdown("## 🔍 Search Samples")
     
@@ -15,24 +16,23 @@ def display_search_interface():
     search_tabs = st.tabs(["Basic Search", "Advanced Search", "Saved Searches"])
     
     with search_tabs[0]:
-        display_basic_search()
+        display_basic_search(session)
     
     with search_tabs[1]:
-        display_advanced_search()
+        display_advanced_search(session)
     
     with search_tabs[2]:
-        display_saved_searches()
+        display_saved_searches(session)
 
-def display_basic_search():
+def display_basic_search(session):
     """Display the basic search interface"""
     search_query = st.text_input("Enter Keyword: (name, type, owner, etc.)", key="basic_search")
     
     if search_query:
-        with get_db_session() as session:
-            search_results = perform_basic_search(session, search_query)
-            display_search_results(search_results, f"Basic search for '{search_query}'")
+        search_results = perform_basic_search(session, search_query)
+        display_search_results(search_results, f"Basic search for '{search_query}'")
 
-def display_advanced_search():
+def display_advanced_search(session):
     """Display the advanced search interface with multiple filters"""
     with st.form("advanced_search_form"):
         st.subheader("Advanced Search")
@@ -48,21 +48,20 @@ def display_advanced_search():
             owner = st.text_input("Owner")
         
         with col2:
-            with get_db_session() as session:
-                freezers = [""] + [f[0] for f in session.query(Freezer.name).all()]
-                freezer = st.selectbox("Freezer", options=freezers)
-                
-                if freezer:
-                    racks = [""] + [r[0] for r in session.query(Rack.id).filter_by(freezer_name=freezer).all()]
-                else:
-                    racks = [""]
-                rack = st.selectbox("Rack", options=racks)
-                
-                if freezer and rack:
-                    boxes = [""] + [b[0] for b in session.query(Box.id).filter_by(freezer_name=freezer, rack_id=rack).all()]
-                else:
-                    boxes = [""]
-                box = st.selectbox("Box", options=boxes)
+            freezers = [""] + list_freezers()
+            freezer = st.selectbox("Freezer", options=freezers)
+            
+            if freezer:
+                racks = [""] + [r["id"] for r in list_racks(freezer)]
+            else:
+                racks = [""]
+            rack = st.selectbox("Rack", options=racks)
+            
+            if freezer and rack:
+                boxes = [""] + [b[0] for b in session.query(Box.id).filter_by(freezer_name=freezer, rack_id=rack).all()]
+            else:
+                boxes = [""]
+            box = st.selectbox("Box", options=boxes)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -122,11 +121,10 @@ def display_advanced_search():
                 save_search_criteria(search_name, search_criteria)
             
             # Perform search
-            with get_db_session() as session:
-                search_results = perform_advanced_search(session, search_criteria)
-                display_search_results(search_results, "Advanced search results")
+            search_results = perform_advanced_search(session, search_criteria)
+            display_search_results(search_results, "Advanced search results")
 
-def display_saved_searches():
+def display_saved_searches(session):
     """Display and manage saved searches"""
     # Load saved searches
     saved_searches = load_saved_searches()
@@ -155,9 +153,8 @@ def display_saved_searches():
         
         with col1:
             if st.button("Run Search"):
-                with get_db_session() as session:
-                    search_results = perform_advanced_search(session, search_criteria)
-                    display_search_results(search_results, f"Results for '{selected_search}'")
+                search_results = perform_advanced_search(session, search_criteria)
+                display_search_results(search_results, f"Results for '{selected_search}'")
         
         with col2:
             if st.button("Delete Search"):
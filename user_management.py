@@ -1,8 +1,10 @@
+import os
 import streamlit as st
 import pandas as pd
 from datetime import datetime
 from user_model import User
-from auth import require_admin, require_login
+from db_utils import upsert_users
+from auth import require_admin, require_login, clear_user_cache
 
 def display_user_management():
     """Display user management interface for admins"""
@@ -134,6 +136,7 @@ def display_add_user_form():
             new_user.set_password(password)
             
             if new_user.save():
+                clear_user_cache()
                 st.success(f"User '{username}' added successfully")
                 st.rerun()
             else:
@@ -183,6 +186,7 @@ def display_user_roles_management():
                 if user and user.role != new_role:
                     user.role = new_role
                     if user.save():
+                        clear_user_cache()
                         changes_made = True
             
             if changes_made:
@@ -248,6 +252,7 @@ def display_user_profile():
                 
             current_user.set_password(new_password)
             if current_user.save():
+                clear_user_cache()
                 st.success("Password changed successfully")
             else:
                 st.error("Failed to update password")
@@ -275,6 +280,7 @@ def change_user_role(user_id):
         if submitted:
             user.role = new_role
             if user.save():
+                clear_user_cache()
                 st.success(f"Role for {user.username} updated to {new_role}")
                 st.rerun()
             else:
@@ -308,6 +314,7 @@ def reset_user_password(user_id):
                 
             user.set_password(new_password)
             if user.save():
+                clear_user_cache()
                 st.success(f"Password for {user.username} has been reset")
                 st.rerun()
             else:
@@ -335,6 +342,7 @@ def toggle_user_status(user_id):
         if submitted:
             user.is_active = not user.is_active
             if user.save():
+                clear_user_cache()
                 st.success(f"User {user.username} is now {new_status}")
                 st.rerun()
             else:
@@ -363,6 +371,7 @@ def delete_user(user_id):
                 return
             
             if user.delete():
+                clear_user_cache()
                 st.success(f"User {user.username} has been deleted")
                 st.rerun()
             else:
@@ -394,7 +403,10 @@ def create_initial_admin():
         admin_user.is_active = True
         admin_user.set_password(admin_password)
         
-        if admin_user.save():
+        # Seed rows go out as one idempotent upsert, so concurrent cold starts
+        # cannot create the admin twice
+        if upsert_users([admin_user.to_dict()]):
+            clear_user_cache()
             print(f"Created initial admin user: admin / {admin_password}")
             return True
     
@@ -4,6 +4,9 @@ import bcrypt
 from datetime import datetime
 from db_utils import get_supabase_session, get_user_by_username, create_user, update_user, delete_user
 
+# Columns needed to list users; leaves out the password hash and salt
+USER_LIST_COLUMNS = "id,username,email,role,created_at,last_login,is_active"
+
 class User:
     """User model for Supabase"""
     
@@ -130,9 +133,9 @@ class User:
     
     @staticmethod
     def get_all_users():
-        """Get all users"""
+        """Get all users for display; the returned users have no password fields and are not meant to be saved"""
         with get_supabase_session(use_service_key=True) as supabase:
-            response = supabase.table("users").select("*").execute()
+            response = supabase.table("users").select(USER_LIST_COLUMNS).execute()
             return [User(user_data) for user_data in response.data]
     
     def update_last_login(self):